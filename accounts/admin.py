@@ -1,7 +1,8 @@
 from django.contrib import admin
 
-from accounts.models import ApplicationUser, UserOTP
+from accounts.models import ApplicationUser, UserOTP, OutboundEmail
 
 # Register your models here.
 admin.site.register(ApplicationUser)
 admin.site.register(UserOTP)
+admin.site.register(OutboundEmail)
@@ -0,0 +1,251 @@
+import json
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.translation import gettext as _
+from rest_framework import serializers, status
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.auth_backends.model_backend import hash_algorithm, password_hash_seconds
+from accounts.hashing import HashPoolSaturated, ahash_password, averify_password
+from accounts.models import ApplicationUser
+from accounts.otp_store import get_otp_store
+from accounts.serializers import (
+    LoginSerializer, OTPVerifySerializer, RegistrationSerializer, SendOTPSerializer,
+    check_login_otp, check_verification_otp,
+)
+from accounts.throttling import LoginThrottle, OTPVerifyThrottle, SendOTPThrottle
+from accounts.tokens import AccountRefreshToken
+from accounts.utils import asend_otp, generate_otp
+from accounts.views import token_payload
+
+# Async endpoints for the auth paths. Under config.asgi they await the
+# password hashing pool, the async ORM and cache, and send SMS from the event
+# loop, so a request waiting on I/O does not hold a thread. Responses match
+# the sync endpoints of the same name.
+
+
+def async_csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt wraps async views in a sync
+    # function on Django 4.2, so set the flag directly.
+    view.csrf_exempt = True
+    return view
+
+
+def error_response(detail, status_code):
+    return JsonResponse(detail, status=status_code, safe=False)
+
+
+def shed_response(exc):
+    response = error_response({'detail': f'{exc.detail}'}, exc.status_code)
+    response['Retry-After'] = f'{exc.wait}'
+    return response
+
+
+def throttled_response(wait):
+    response = error_response(
+        {'detail': _('Request was throttled.')}, status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    if wait is not None:
+        response['Retry-After'] = f'{math.ceil(wait)}'
+    return response
+
+
+def invalid(message):
+    return serializers.ValidationError({'non_field_errors': [message]})
+
+
+async def check_throttle(throttle_class, request, data):
+    throttle = throttle_class()
+    if await sync_to_async(throttle.check)(request, data):
+        return None
+    return throttled_response(throttle.wait())
+
+
+def parse_body(request):
+    if request.method != 'POST':
+        return None, error_response(
+            {'detail': _('Method "%s" not allowed.') % request.method},
+            status.HTTP_405_METHOD_NOT_ALLOWED,
+        )
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        data = None
+    # Every view reads fields with data.get(), so arrays, strings and
+    # numbers are refused here rather than failing with a 500 there.
+    if not isinstance(data, dict):
+        return None, error_response({'detail': _('Invalid JSON body.')}, status.HTTP_400_BAD_REQUEST)
+    return data, None
+
+
+async def authenticate_password(email, password):
+    user = await ApplicationUser.objects.filter(email_lookup=email.lower()).afirst()
+    if user is None or not user.is_active:
+        return None
+
+    algorithm = hash_algorithm(user.password)
+    started = time.perf_counter()
+    is_valid, upgraded = await averify_password(password, user.password)
+    password_hash_seconds.observe(time.perf_counter() - started, algorithm=algorithm)
+
+    if not is_valid:
+        return None
+    if upgraded:
+        user.password = upgraded
+        await user.asave(update_fields=['password'])
+    return user
+
+
+async def authenticate_otp(phone, otp):
+    try:
+        user = await ApplicationUser.objects.aget(phone=phone)
+    except ApplicationUser.DoesNotExist:
+        raise invalid(_('User does not exist.'))
+
+    otp_store = get_otp_store()
+    user_otp = await otp_store.alatest(user)
+    check_login_otp(user_otp, otp)
+    await otp_store.adiscard(user, user_otp)
+    return user
+
+
+@async_csrf_exempt
+async def login(request):
+    data, error = parse_body(request)
+    if error:
+        return error
+    throttled = await check_throttle(LoginThrottle, request, data)
+    if throttled:
+        return throttled
+
+    try:
+        attrs = LoginSerializer(data=data).to_internal_value(data)
+        if attrs.get('email') and attrs.get('password'):
+            user = await authenticate_password(attrs['email'], attrs['password'])
+            if user is None:
+                raise invalid("Invalid email or password.")
+        elif attrs.get('phone') and attrs.get('otp'):
+            user = await authenticate_otp(attrs['phone'], attrs['otp'])
+        else:
+            raise invalid("Invalid combination of credentials.")
+    except serializers.ValidationError as e:
+        return error_response(serializers.as_serializer_error(e), status.HTTP_400_BAD_REQUEST)
+    except HashPoolSaturated as e:
+        return shed_response(e)
+
+    refresh = await AccountRefreshToken.afor_user(user)
+    return JsonResponse(token_payload(user, refresh), status=status.HTTP_200_OK)
+
+
+@async_csrf_exempt
+async def send_otp(request):
+    data, error = parse_body(request)
+    if error:
+        return error
+    throttled = await check_throttle(SendOTPThrottle, request, data)
+    if throttled:
+        return throttled
+
+    try:
+        attrs = SendOTPSerializer(data=data).to_internal_value(data)
+        user = await ApplicationUser.objects.filter(phone=attrs['phone']).afirst()
+        if user is None:
+            raise invalid(_('Enter phone number is not correct.'))
+        otp = generate_otp()
+        try:
+            await get_otp_store().aissue(user, otp)
+        except Exception as e:
+            raise serializers.ValidationError(f'{e}')
+    except serializers.ValidationError as e:
+        return error_response(serializers.as_serializer_error(e), status.HTTP_400_BAD_REQUEST)
+
+    asend_otp(user, otp)
+    return JsonResponse({'otp': otp}, status=status.HTTP_200_OK)
+
+
+@async_csrf_exempt
+async def otp_verify(request):
+    data, error = parse_body(request)
+    if error:
+        return error
+    throttled = await check_throttle(OTPVerifyThrottle, request, data)
+    if throttled:
+        return throttled
+
+    try:
+        attrs = OTPVerifySerializer(data=data).to_internal_value(data)
+        try:
+            user = await ApplicationUser.objects.aget(email=attrs['email'])
+        except ApplicationUser.DoesNotExist:
+            raise invalid(_('Email does not exist.'))
+
+        otp_store = get_otp_store()
+        user_otp = await otp_store.alatest(user)
+        check_verification_otp(user_otp, attrs['otp'])
+    except serializers.ValidationError as e:
+        return error_response(serializers.as_serializer_error(e), status.HTTP_400_BAD_REQUEST)
+
+    await otp_store.amark_verified(user, user_otp)
+    user.is_email_verified = True
+    await user.asave(update_fields=['is_email_verified'])
+    return JsonResponse({'detail': 'Email verified successfully.'}, status=status.HTTP_200_OK)
+
+
+def invalid_token_response(message):
+    return error_response(
+        {'detail': f'{message}', 'code': 'token_not_valid'}, status.HTTP_401_UNAUTHORIZED,
+    )
+
+
+@async_csrf_exempt
+async def token_refresh(request):
+    data, error = parse_body(request)
+    if error:
+        return error
+    if not data.get('refresh'):
+        return error_response(
+            {'refresh': [_('This field is required.')]}, status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        refresh = await AccountRefreshToken.averify(f'{data["refresh"]}')
+    except TokenError as e:
+        return invalid_token_response(e.args[0])
+
+    try:
+        refresh.refresh_claims(await refresh.current_claims().afirst())
+    except TokenError as e:
+        return invalid_token_response(e.args[0])
+
+    payload = {'access': str(refresh.access_token)}
+    if api_settings.ROTATE_REFRESH_TOKENS:
+        if api_settings.BLACKLIST_AFTER_ROTATION:
+            await sync_to_async(refresh.blacklist)()
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        payload['refresh'] = str(refresh)
+    return JsonResponse(payload, status=status.HTTP_200_OK)
+
+
+@async_csrf_exempt
+async def registration(request):
+    data, error = parse_body(request)
+    if error:
+        return error
+
+    serializer = RegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return error_response(serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    try:
+        encoded_password = await ahash_password(serializer.validated_data['password'])
+    except HashPoolSaturated as e:
+        return shed_response(e)
+
+    await sync_to_async(serializer.save)(encoded_password=encoded_password)
+    return JsonResponse({'detail': 'OTP send successfully.'}, status=status.HTTP_201_CREATED)
@@ -1,10 +1,27 @@
+import time
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import identify_hasher
 from django.db.models import Q
 from django.utils.translation import gettext as _
 
 from rest_framework.exceptions import PermissionDenied
 
+from config.metrics import histogram
+
+password_hash_seconds = histogram(
+    'password_hash_seconds',
+    'Time spent verifying (and upgrading) password hashes on login.',
+)
+
+
+def hash_algorithm(encoded):
+    try:
+        return identify_hasher(encoded).algorithm
+    except ValueError:
+        return 'unknown'
+
 
 class CustomModelBackend(ModelBackend):
     def authenticate(self, request, username=None, email=None, phone=None, password=None, **kwargs):
@@ -13,8 +30,10 @@ class CustomModelBackend(ModelBackend):
 
         UserModel = get_user_model()
 
-        username_query_dict = {'username__iexact': username}
-        email_query_dict = {'email__iexact': email}
+        # Match the lower-cased lookup columns so each credential resolves
+        # through an index in a single query.
+        username_query_dict = {'username_lookup': username.lower() if username else None}
+        email_query_dict = {'email_lookup': email.lower() if email else None}
 
         try:
             query_filter = Q()
@@ -33,6 +52,19 @@ class CustomModelBackend(ModelBackend):
         except Exception as e:
             return None
         else:
-            if user.check_password(password):
+            if self.timed_check_password(user, password):
                 return user
         return None
+
+    def timed_check_password(self, user, password):
+        """
+        `check_password` rehashes with the preferred hasher when the stored
+        hash uses another algorithm or outdated parameters. The time spent is
+        recorded per stored algorithm to size workers against a latency budget.
+        """
+        algorithm = hash_algorithm(user.password)
+        started = time.perf_counter()
+        try:
+            return user.check_password(password)
+        finally:
+            password_hash_seconds.observe(time.perf_counter() - started, algorithm=algorithm)
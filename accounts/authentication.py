@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+CLAIM_FIELDS = ('role', 'is_staff', 'is_active', 'token_version')
+
+
+class ClaimsUser(TokenUser):
+    """
+    Lightweight user built from the claims embedded by `AccountRefreshToken`.
+    The `ApplicationUser` row is only fetched when an attribute that is not
+    a claim is accessed, or when a view asks for `instance` explicitly.
+    """
+
+    @cached_property
+    def username(self):
+        return self.token.get('username') or self.instance.username
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+    @cached_property
+    def token_version(self):
+        return self.token.get('token_version', 0)
+
+    @cached_property
+    def instance(self):
+        UserModel = get_user_model()
+        try:
+            return UserModel.objects.get(**{api_settings.USER_ID_FIELD: self.id})
+        except UserModel.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+    def __eq__(self, other):
+        if isinstance(other, get_user_model()):
+            return self.id == other.pk
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_') or attr in ('token', 'instance'):
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the user claims in the access token
+    instead of looking the user up on every request. Tokens issued before
+    the claims were added fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if any(claim not in validated_token for claim in CLAIM_FIELDS):
+            return super().get_user(validated_token)
+
+        user = ClaimsUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+CACHE_KEY_PREFIX = 'token-blacklist'
+
+
+class LocalLRU:
+    """
+    Bounded, thread-safe LRU mapping where every entry carries its own
+    absolute expiry timestamp.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (value, time.time() + timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class BlacklistCache:
+    """
+    Answers "is this jti revoked?" from a per-process LRU, then the shared
+    Django cache, then the token blacklist tables.
+
+    The database stays the source of truth. Only revoked answers are kept in
+    the local LRU, because a revocation is final for the token's remaining
+    lifetime while a "not revoked" answer can be invalidated by another
+    process. The shared cache, which `blacklist` writes through to, keeps
+    revoked answers for the token's lifetime and "not revoked" ones for at
+    most `negative_timeout` seconds, so a token blacklisted without
+    `blacklist` (admin, another service) is rejected soon after.
+    """
+
+    def __init__(self, alias=None, max_entries=None, negative_timeout=None):
+        self.alias = alias or settings.TOKEN_BLACKLIST_CACHE_ALIAS
+        self.local = LocalLRU(max_entries or settings.TOKEN_BLACKLIST_LOCAL_MAX_ENTRIES)
+        self.negative_timeout = (
+            settings.TOKEN_BLACKLIST_NEGATIVE_TIMEOUT if negative_timeout is None else negative_timeout
+        )
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    @staticmethod
+    def make_key(jti):
+        return f'{CACHE_KEY_PREFIX}:{jti}'
+
+    @staticmethod
+    def remaining_lifetime(exp):
+        return max(int(exp - time.time()), 0)
+
+    def shared_timeout(self, revoked, timeout):
+        return timeout if revoked else min(timeout, self.negative_timeout)
+
+    def is_revoked(self, jti, exp):
+        if self.local.get(jti):
+            return True
+
+        timeout = self.remaining_lifetime(exp)
+        if not timeout:
+            # Expired tokens are rejected by signature verification anyway.
+            return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+        key = self.make_key(jti)
+        revoked = self.shared.get(key)
+        if revoked is None:
+            revoked = BlacklistedToken.objects.filter(token__jti=jti).exists()
+            self.shared.set(key, revoked, self.shared_timeout(revoked, timeout))
+
+        if revoked:
+            self.local.set(jti, True, timeout)
+        return revoked
+
+    async def ais_revoked(self, jti, exp):
+        """
+        `is_revoked` for async callers, using the async cache and ORM APIs.
+        """
+        if self.local.get(jti):
+            return True
+
+        timeout = self.remaining_lifetime(exp)
+        if not timeout:
+            return await BlacklistedToken.objects.filter(token__jti=jti).aexists()
+
+        key = self.make_key(jti)
+        revoked = await self.shared.aget(key)
+        if revoked is None:
+            revoked = await BlacklistedToken.objects.filter(token__jti=jti).aexists()
+            await self.shared.aset(key, revoked, self.shared_timeout(revoked, timeout))
+
+        if revoked:
+            self.local.set(jti, True, timeout)
+        return revoked
+
+    def mark_revoked(self, jti, exp):
+        timeout = self.remaining_lifetime(exp)
+        if not timeout:
+            return
+        self.shared.set(self.make_key(jti), True, timeout)
+        self.local.set(jti, True, timeout)
+
+
+blacklist_cache = BlacklistCache()
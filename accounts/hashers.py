@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Subclasses keep the stock algorithm names, so hashes written by the stock
+# hashers still verify and `must_update` triggers a rehash on login when the
+# tuned parameters differ from the stored ones.
+
+
+class TunedPBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    iterations = settings.PASSWORD_PBKDF2_ITERATIONS
+
+
+class TunedScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    work_factor = settings.PASSWORD_SCRYPT_WORK_FACTOR
+    block_size = settings.PASSWORD_SCRYPT_BLOCK_SIZE
+    parallelism = settings.PASSWORD_SCRYPT_PARALLELISM
+
+
+class TunedArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+    time_cost = settings.PASSWORD_ARGON2_TIME_COST
+    memory_cost = settings.PASSWORD_ARGON2_MEMORY_COST
+    parallelism = settings.PASSWORD_ARGON2_PARALLELISM
@@ -0,0 +1,95 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+class HashPoolSaturated(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = _('Server is busy, please retry shortly.')
+    default_code = 'hash_pool_saturated'
+
+    def __init__(self, detail=None, code=None, wait=None):
+        super().__init__(detail, code)
+        self.wait = wait or settings.PASSWORD_HASH_RETRY_AFTER
+
+
+def _init_worker():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+
+def _make_password(raw_password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(raw_password)
+
+
+def _check_password(raw_password, encoded):
+    """
+    Returns `(is_valid, encoded)`, where `encoded` is the upgraded hash when
+    the stored one uses an outdated hasher or parameters, otherwise None.
+    """
+    from django.contrib.auth.hashers import check_password, make_password
+
+    upgraded = []
+    is_valid = check_password(
+        raw_password, encoded,
+        setter=lambda raw: upgraded.append(make_password(raw)),
+    )
+    return is_valid, upgraded[0] if upgraded else None
+
+
+def get_executor():
+    global _executor, _slots
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_MAX_PENDING)
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.PASSWORD_HASH_WORKERS,
+                    initializer=_init_worker,
+                )
+    return _executor
+
+
+def submit(fn, *args):
+    """
+    Queue `fn` on the hashing pool, shedding load instead of queueing when
+    `PASSWORD_HASH_MAX_PENDING` jobs are already waiting or running.
+    """
+    executor = get_executor()
+    if not _slots.acquire(blocking=False):
+        raise HashPoolSaturated()
+    try:
+        future = executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def hash_password(raw_password):
+    return submit(_make_password, raw_password).result()
+
+
+def verify_password(raw_password, encoded):
+    return submit(_check_password, raw_password, encoded).result()
+
+
+async def ahash_password(raw_password):
+    return await asyncio.wrap_future(submit(_make_password, raw_password))
+
+
+async def averify_password(raw_password, encoded):
+    return await asyncio.wrap_future(submit(_check_password, raw_password, encoded))
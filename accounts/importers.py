@@ -0,0 +1,93 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db.models import Q
+from rest_framework.validators import UniqueValidator
+
+from accounts.hashing import _init_worker, _make_password
+from accounts.models import ApplicationUser
+from accounts.serializers import RegistrationSerializer
+from config.importer import BaseImporter
+
+UNIQUE_FIELDS = ('username', 'email', 'phone')
+# Columns compared for duplicates: logins match username and email case
+# insensitively, so 'Alice' and 'alice' are the same user.
+LOOKUP_FIELDS = {'username': 'username_lookup', 'email': 'email_lookup', 'phone': 'phone'}
+
+
+def lookup_value(field_name, value):
+    value = f'{value}'
+    return value if field_name == 'phone' else value.lower()
+
+
+class UserImportSerializer(RegistrationSerializer):
+    """
+    `RegistrationSerializer` field rules without the per-record unique
+    queries, which `UserImporter` runs once per chunk instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field_name in UNIQUE_FIELDS:
+            field = self.fields[field_name]
+            field.validators = [
+                validator for validator in field.validators
+                if not isinstance(validator, UniqueValidator)
+            ]
+
+
+class UserImporter(BaseImporter):
+    """
+    Imports users without sending the registration OTP email. Password
+    hashes are computed in a process pool of `hash_workers` processes, one
+    per CPU by default.
+    """
+    model = ApplicationUser
+    serializer_class = UserImportSerializer
+
+    def __init__(self, batch_size=None, hash_workers=None):
+        super().__init__(batch_size)
+        self.hash_workers = hash_workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.hash_workers, initializer=_init_worker)
+
+    def validate_chunk(self, records, validated, errors):
+        values = {field_name: {} for field_name in UNIQUE_FIELDS}
+        for index, attrs in list(validated.items()):
+            for field_name in UNIQUE_FIELDS:
+                if lookup_value(field_name, attrs[field_name]) in values[field_name]:
+                    errors[index] = {field_name: [f'Duplicate {field_name} in input.']}
+                    del validated[index]
+                    break
+            else:
+                for field_name in UNIQUE_FIELDS:
+                    values[field_name][lookup_value(field_name, attrs[field_name])] = index
+
+        existing = ApplicationUser.objects.filter(
+            Q(username_lookup__in=values['username'])
+            | Q(email_lookup__in=values['email'])
+            | Q(phone__in=values['phone'])
+        ).values_list(*LOOKUP_FIELDS.values())
+        for row in existing:
+            for field_name, value in zip(UNIQUE_FIELDS, row):
+                index = values[field_name].get(f'{value}')
+                if index in validated:
+                    errors[index] = {
+                        field_name: [ApplicationUser._meta.get_field(field_name).error_messages['unique']]
+                    }
+                    del validated[index]
+
+    def build(self, validated):
+        passwords = [attrs.pop('password') for attrs in validated]
+        chunksize = max(1, len(passwords) // (self.hash_workers * 4))
+        hashes = self.executor.map(_make_password, passwords, chunksize=chunksize)
+
+        users = []
+        for attrs, encoded in zip(validated, hashes):
+            user = ApplicationUser(**attrs, password=encoded)
+            # bulk_create bypasses save(), which normally fills these in.
+            user.sync_lookup_fields()
+            users.append(user)
+        return users
+
+    def finish(self):
+        self.executor.shutdown()
@@ -0,0 +1,148 @@
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import OutboundEmail
+from config.instrumentation import external_call
+
+
+def enqueue_email(subject, message, recipient_list):
+    """
+    Queue an email for delivery by the `run_email_workers` command instead
+    of talking to the SMTP server inside the request.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=settings.EMAIL_HOST_USER,
+        recipient_list=list(recipient_list),
+    )
+
+
+class EmailDispatcher:
+    """
+    Drains due `OutboundEmail` rows in batches over a single, persistent
+    connection to the configured email backend.
+
+    Claimed rows are leased by pushing `next_attempt_at` forward, so a row
+    held by a crashed worker becomes due again once the lease runs out.
+    Failed sends are retried with exponential backoff until
+    `EMAIL_QUEUE_MAX_ATTEMPTS` is reached.
+    """
+
+    def __init__(self, batch_size=None, max_attempts=None, retry_backoff=None, lease=None):
+        self.batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+        self.max_attempts = max_attempts or settings.EMAIL_QUEUE_MAX_ATTEMPTS
+        self.retry_backoff = retry_backoff or settings.EMAIL_QUEUE_RETRY_BACKOFF
+        self.lease = lease or settings.EMAIL_QUEUE_LEASE
+        self.connection = None
+
+    def get_connection(self):
+        if self.connection is None:
+            self.connection = get_connection(fail_silently=False)
+            self.connection.open()
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            try:
+                self.connection.close()
+            except Exception:
+                pass
+            self.connection = None
+
+    def claim_batch(self):
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(
+                OutboundEmail.objects.select_for_update(skip_locked=True).filter(
+                    status=OutboundEmail.STATUS_PENDING,
+                    next_attempt_at__lte=now,
+                ).order_by('next_attempt_at')[:self.batch_size]
+            )
+            if batch:
+                OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                    next_attempt_at=now + timezone.timedelta(seconds=self.lease)
+                )
+        return batch
+
+    def send(self, email):
+        message = EmailMessage(
+            subject=email.subject,
+            body=email.message,
+            from_email=email.from_email,
+            to=email.recipient_list,
+            connection=self.get_connection(),
+        )
+        with external_call('smtp'):
+            message.send()
+
+    def mark_failed(self, email, error):
+        email.attempts += 1
+        email.last_error = f'{error}'
+        if email.attempts >= self.max_attempts:
+            email.status = OutboundEmail.STATUS_FAILED
+        else:
+            backoff = self.retry_backoff * 2 ** (email.attempts - 1)
+            email.next_attempt_at = timezone.now() + timezone.timedelta(seconds=backoff)
+        email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+    def send_batch(self, batch):
+        sent = failed = 0
+        sent_ids = []
+        for email in batch:
+            try:
+                self.send(email)
+            except Exception as e:
+                # Drop the connection so the next message starts a fresh session.
+                self.close()
+                self.mark_failed(email, e)
+                failed += 1
+            else:
+                sent_ids.append(email.pk)
+                sent += 1
+        if sent_ids:
+            OutboundEmail.objects.filter(pk__in=sent_ids).update(
+                status=OutboundEmail.STATUS_SENT,
+                sent_at=timezone.now(),
+                attempts=F('attempts') + 1,
+            )
+        return sent, failed
+
+    def drain(self):
+        """
+        Send everything that is currently due and return `(sent, failed)`.
+        """
+        sent = failed = 0
+        while True:
+            batch = self.claim_batch()
+            if not batch:
+                return sent, failed
+            batch_sent, batch_failed = self.send_batch(batch)
+            sent += batch_sent
+            failed += batch_failed
+
+
+class EmailWorker(threading.Thread):
+    def __init__(self, stop_event, poll_interval, **dispatcher_kwargs):
+        super().__init__(daemon=True)
+        self.stop_event = stop_event
+        self.poll_interval = poll_interval
+        self.dispatcher = EmailDispatcher(**dispatcher_kwargs)
+
+    def run(self):
+        try:
+            while not self.stop_event.is_set():
+                close_old_connections()
+                sent, failed = self.dispatcher.drain()
+                if not sent and not failed:
+                    # Release the SMTP session while idle.
+                    self.dispatcher.close()
+                    self.stop_event.wait(self.poll_interval)
+        finally:
+            self.dispatcher.close()
+            connections.close_all()
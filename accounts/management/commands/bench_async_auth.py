@@ -0,0 +1,161 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from accounts.otp_store import get_otp_store
+from accounts.sms import LocMemSMSBackend, _tasks, reset_sms_backend
+from config.loadtest import LoadTest, ScenarioStats
+
+ENDPOINTS = {
+    # name: (sync path, async path)
+    'send_otp': ('/accounts/auth/send-otp/', '/accounts/async/auth/send-otp/'),
+    'login_phone': ('/accounts/auth/login/', '/accounts/async/auth/login/'),
+    'token_refresh': ('/api/token/refresh/', '/accounts/async/token/refresh/'),
+}
+
+
+class ThreadSampler:
+    """Records the peak number of live threads while running."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def __enter__(self):
+        self.peak = threading.active_count()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            # Minus the sampler itself.
+            self.peak = max(self.peak, threading.active_count() - 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the sync auth endpoints served the WSGI way, one thread per "
+        "in-flight request, with the async endpoints served the ASGI way, "
+        "all in-flight requests on one event loop, at increasing numbers of "
+        "concurrent connections. Reports throughput, latency percentiles "
+        "and the peak number of threads each needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help="Requests per endpoint and level; login_phone uses one seeded user per request.",
+        )
+        parser.add_argument('--concurrency', default='1,10,50,200', help="Comma separated levels.")
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="Repeatable, defaults to all.")
+        parser.add_argument('--host', default='localhost', help="Host header, must be in ALLOWED_HOSTS.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("An in-memory SQLite database is not shared between threads.")
+        endpoints = options['endpoints'] or list(ENDPOINTS)
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoint(s): {', '.join(sorted(unknown))}")
+        levels = [int(level) for level in options['concurrency'].split(',')]
+
+        self.host = options['host']
+        self.requests = options['requests']
+        self.loadtest = LoadTest(users=options['users'], products=0, requests=self.requests, concurrency=1)
+        self.stdout.write(f'Seeding {options["users"]} users ({self.loadtest.run_id})')
+        self.loadtest.seed()
+        try:
+            with override_settings(SMS_BACKEND='accounts.sms.LocMemSMSBackend', AUTH_THROTTLE_RATES={}):
+                reset_sms_backend()
+                for endpoint in endpoints:
+                    for level in levels:
+                        for mode in ('wsgi', 'asgi'):
+                            self.write_result(endpoint, mode, level, *self.measure(endpoint, mode, level))
+        finally:
+            reset_sms_backend()
+            self.loadtest.cleanup()
+
+    def payload(self, endpoint, i):
+        user = self.loadtest.users[i % len(self.loadtest.users)]
+        if endpoint == 'send_otp':
+            return {'phone': f'{user.phone}'}
+        if endpoint == 'login_phone':
+            return {'phone': f'{user.phone}', 'otp': self.otps[user.pk]}
+        return {'refresh': self.loadtest.tokens[user.pk][0]}
+
+    def measure(self, endpoint, mode, level):
+        if endpoint == 'login_phone':
+            # Setup, not measured: a fresh OTP for every user.
+            otp_store = get_otp_store()
+            self.otps = {}
+            for user in self.loadtest.users:
+                self.otps[user.pk] = 1000 + user.pk % 9000
+                otp_store.issue(user, self.otps[user.pk])
+
+        stats = ScenarioStats()
+        payloads = [self.payload(endpoint, i) for i in range(self.requests)]
+        sync_path, async_path = ENDPOINTS[endpoint]
+        with ThreadSampler() as sampler:
+            started = time.perf_counter()
+            if mode == 'wsgi':
+                self.run_wsgi(sync_path, payloads, level, stats)
+            else:
+                asyncio.run(self.run_asgi(async_path, payloads, level, stats))
+            wall_seconds = time.perf_counter() - started
+        LocMemSMSBackend.outbox.clear()
+        return stats.summary(wall_seconds), sampler.peak
+
+    def run_wsgi(self, path, payloads, level, stats):
+        local = threading.local()
+
+        def send(payload):
+            if not hasattr(local, 'client'):
+                local.client = Client(HTTP_HOST=self.host)
+            started = time.perf_counter()
+            response = local.client.post(path, data=payload, content_type='application/json')
+            stats.record(time.perf_counter() - started, 0, response.status_code)
+
+        def worker(chunk):
+            try:
+                for payload in chunk:
+                    send(payload)
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=level) as executor:
+            list(executor.map(worker, [payloads[i::level] for i in range(level)]))
+
+    async def run_asgi(self, path, payloads, level, stats):
+        client = AsyncClient(HTTP_HOST=self.host)
+        pending = iter(payloads)
+
+        async def connection_loop():
+            for payload in pending:
+                started = time.perf_counter()
+                response = await client.post(path, data=payload, content_type='application/json')
+                stats.record(time.perf_counter() - started, 0, response.status_code)
+
+        await asyncio.gather(*(connection_loop() for _ in range(level)))
+        # Let the SMS tasks scheduled by send_otp finish on this loop.
+        await asyncio.gather(*_tasks)
+
+    def write_result(self, endpoint, mode, level, result, peak_threads):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{endpoint:>13} {mode} x{level:<4}: {result["throughput_rps"]:8.1f} req/s, '
+            f'p50 {latency["p50"]:8.2f} ms, p99 {latency["p99"]:8.2f} ms, '
+            f'{peak_threads:3d} threads, {result["errors"]} error(s)'
+        )
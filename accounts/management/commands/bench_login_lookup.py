@@ -0,0 +1,65 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the case-insensitive credential lookup with the normalized "
+        "lookup columns used by CustomModelBackend. Seeds users inside a "
+        "rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000000)
+        parser.add_argument('--lookups', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['users'], options['batch_size'])
+            self.run(options['users'], options['lookups'])
+            transaction.set_rollback(True)
+
+    def seed(self, count, batch_size):
+        UserModel = get_user_model()
+        started = time.perf_counter()
+        for start in range(0, count, batch_size):
+            UserModel.objects.bulk_create(
+                UserModel(
+                    username=f'Bench{i}',
+                    username_lookup=f'bench{i}',
+                    email=f'Bench{i}@Example.com',
+                    email_lookup=f'bench{i}@example.com',
+                    password='!',
+                )
+                for i in range(start, min(start + batch_size, count))
+            )
+        self.stdout.write(f'Seeded {count} users in {time.perf_counter() - started:.1f}s')
+
+    def run(self, count, lookups):
+        UserModel = get_user_model()
+        emails = [f'bench{random.randrange(count)}@EXAMPLE.com' for _ in range(lookups)]
+
+        def iexact(email):
+            return UserModel.objects.get(Q(email__iexact=email))
+
+        def normalized(email):
+            return UserModel.objects.get(Q(email_lookup=email.lower()))
+
+        for label, lookup in (('iexact', iexact), ('normalized', normalized)):
+            timings = []
+            for email in emails:
+                started = time.perf_counter()
+                lookup(email)
+                timings.append(time.perf_counter() - started)
+            timings.sort()
+            self.stdout.write(
+                f'{label:>10}: p50 {timings[len(timings) // 2] * 1000:.2f} ms, '
+                f'p99 {timings[int(len(timings) * 0.99)] * 1000:.2f} ms, '
+                f'mean {sum(timings) / len(timings) * 1000:.2f} ms'
+            )
@@ -0,0 +1,41 @@
+import math
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Time each configured password hasher and estimate the workers needed "
+        "to sustain a login rate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument(
+            '--logins-per-second', type=float, default=50,
+            help="Target login rate used to estimate the worker count.",
+        )
+
+    def handle(self, *args, **options):
+        rounds = options['rounds']
+        for hasher in get_hashers():
+            try:
+                encoded = hasher.encode('benchmark-password', hasher.salt())
+            except (ImportError, ValueError) as e:
+                self.stdout.write(f'{hasher.algorithm:>14}: unavailable ({e})')
+                continue
+
+            started = time.perf_counter()
+            for _ in range(rounds):
+                hasher.verify('benchmark-password', encoded)
+            per_hash = (time.perf_counter() - started) / rounds
+            workers = math.ceil(options['logins_per_second'] * per_hash)
+            preferred = ' (preferred)' if hasher is get_hashers()[0] else ''
+            self.stdout.write(
+                f'{hasher.algorithm:>14}: {per_hash * 1000:.1f} ms/verify, '
+                f'{workers} worker(s) for {options["logins_per_second"]:.0f} logins/s{preferred}'
+            )
+        self.stdout.write(f'PASSWORD_HASHERS = {settings.PASSWORD_HASHERS}')
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.blacklist import blacklist_cache
+from accounts.models import ApplicationUser
+from accounts.tokens import AccountRefreshToken
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare refresh-token blacklist checks through the cache layer with "
+        "the plain database lookup. Runs inside a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tokens', type=int, default=200)
+        parser.add_argument('--rounds', type=int, default=5)
+        parser.add_argument('--revoked-ratio', type=float, default=0.1)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.run(options['tokens'], options['rounds'], options['revoked_ratio'])
+            transaction.set_rollback(True)
+
+    def run(self, token_count, rounds, revoked_ratio):
+        user = ApplicationUser.objects.create_user(
+            username='bench-refresh', email='bench-refresh@example.com'
+        )
+        tokens = [AccountRefreshToken.for_user(user) for _ in range(token_count)]
+        for token in tokens[:int(token_count * revoked_ratio)]:
+            token.blacklist()
+        raw_tokens = [str(token) for token in tokens]
+
+        blacklist_cache.local.clear()
+        for label, token_class in (('database', RefreshToken), ('cached', AccountRefreshToken)):
+            started = time.perf_counter()
+            for _ in range(rounds):
+                for raw in raw_tokens:
+                    try:
+                        token_class(raw).access_token
+                    except TokenError:
+                        pass
+            elapsed = time.perf_counter() - started
+            checks = token_count * rounds
+            self.stdout.write(
+                f'{label:>8}: {checks} refreshes in {elapsed:.3f}s '
+                f'({checks / elapsed:.0f}/s)'
+            )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from accounts.purge import purge_all
+
+
+class Command(BaseCommand):
+    help = "Delete expired UserOTP and PasswordResetId rows in bounded chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None)
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help="Seconds to sleep between chunks to spread out lock time.",
+        )
+
+    def handle(self, *args, **options):
+        total = 0
+        for result in purge_all(options['chunk_size'], options['pause']):
+            self.stdout.write(f'{result}')
+            total += result.deleted
+        self.stdout.write(self.style.SUCCESS(f'Removed {total} expired row(s).'))
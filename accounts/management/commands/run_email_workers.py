@@ -0,0 +1,50 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from accounts.mail import EmailDispatcher, EmailWorker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Send everything that is currently due and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            dispatcher = EmailDispatcher(batch_size=options['batch_size'])
+            try:
+                sent, failed = dispatcher.drain()
+            finally:
+                dispatcher.close()
+            self.stdout.write(f'Sent {sent} email(s), {failed} failed.')
+            return
+
+        stop_event = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop_event.set())
+
+        workers = [
+            EmailWorker(
+                stop_event,
+                options['poll_interval'],
+                batch_size=options['batch_size'],
+            )
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f'Started {len(workers)} email worker(s).')
+
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=0.5)
+        self.stdout.write('Email workers stopped.')
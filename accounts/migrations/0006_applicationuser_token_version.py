@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_applicationuser_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationuser',
+            name='token_version',
+            field=models.PositiveIntegerField(default=0, help_text='Bumped to invalidate refresh tokens issued before a credential change.', verbose_name='token version'),
+        ),
+    ]
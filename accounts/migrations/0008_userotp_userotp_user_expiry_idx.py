@@ -0,0 +1,17 @@
+# Generated by Django 4.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userotp',
+            index=models.Index(fields=['user', 'expiration_time'], name='userotp_user_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 12:40
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def populate_lookup_fields(apps, schema_editor):
+    ApplicationUser = apps.get_model('accounts', 'ApplicationUser')
+    ApplicationUser.objects.update(
+        username_lookup=Lower('username'),
+        email_lookup=Lower('email'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_userotp_userotp_user_expiry_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='applicationuser',
+            name='username_lookup',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=150, null=True),
+        ),
+        migrations.AddField(
+            model_name='applicationuser',
+            name='email_lookup',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(populate_lookup_fields, migrations.RunPython.noop),
+    ]
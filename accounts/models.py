@@ -63,12 +63,23 @@ class ApplicationUser(AbstractBaseUser, PermissionsMixin):
         unique=True,
         error_messages={"unique": _("A user with that phone already exists.")}
     )
+    # Lower-cased copies of username/email so case-insensitive logins are a
+    # plain equality match on an index instead of UPPER()/LIKE scans.
+    username_lookup = models.CharField(max_length=150, null=True, blank=True, editable=False, db_index=True)
+    email_lookup = models.CharField(max_length=254, null=True, blank=True, editable=False, db_index=True)
+    token_version = models.PositiveIntegerField(
+        _("token version"),
+        default=0,
+        help_text=_("Bumped to invalidate refresh tokens issued before a credential change."),
+    )
 
     objects = UserManager()
 
     EMAIL_FIELD = "email"
     USERNAME_FIELD = "username"
     REQUIRED_FIELDS = ["email"]
+    # Copied into issued tokens; changing any of them revokes those tokens.
+    CLAIM_FIELDS = ("role", "is_staff", "is_active")
 
     class Meta:
         verbose_name = _("user")
@@ -77,6 +88,85 @@ class ApplicationUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f'{self.id} - {self.username}'
 
+    def sync_lookup_fields(self):
+        # Also called directly by code paths that bypass save(), e.g. bulk_create.
+        self.username_lookup = self.username.lower() if self.username else None
+        self.email_lookup = self.email.lower() if self.email else None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self, fields, update_fields=None):
+        """
+        Those of `fields` that differ from the values last loaded from or saved
+        to the database, only counting `update_fields` when given. A field
+        assigned without a known saved value counts as changed.
+        """
+        saved = getattr(self, '_saved_values', {})
+        return [
+            field for field in fields
+            if (update_fields is None or field in update_fields)
+            and field in self.__dict__
+            and saved.get(field, models.DEFERRED) != getattr(self, field)
+        ]
+
+    def save(self, *args, **kwargs):
+        self.sync_lookup_fields()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'username' in update_fields:
+                update_fields.add('username_lookup')
+            if 'email' in update_fields:
+                update_fields.add('email_lookup')
+            kwargs['update_fields'] = update_fields
+
+        if not self._state.adding and self.changed_fields(self.CLAIM_FIELDS, update_fields):
+            # Tokens issued before the change carry the old role/status.
+            self.token_version += 1
+            if update_fields is not None:
+                update_fields.add('token_version')
+
+        super().save(*args, **kwargs)
+        self.remember_saved_values(update_fields)
+
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using, fields)
+        self.remember_saved_values(fields)
+
+    def remember_saved_values(self, fields=None):
+        self._saved_values = {
+            **getattr(self, '_saved_values', {}),
+            **{
+                field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+                if field.attname in self.__dict__ and (fields is None or field.attname in fields)
+            },
+        }
+
+
+class UserOTPQuerySet(models.QuerySet):
+    def live(self, user):
+        return self.filter(
+            user=user, expiration_time__gt=timezone.now()
+        ).only(
+            'id', 'otp', 'expiration_time', 'is_verified'
+        ).order_by('-expiration_time', '-id')
+
+    def latest_live(self, user):
+        """
+        Latest unexpired OTP for `user` in a single query served by the
+        `(user, expiration_time)` index, loading only the columns that
+        verification reads.
+        """
+        return self.live(user).first()
+
+    async def alatest_live(self, user):
+        return await self.live(user).afirst()
+
 
 class UserOTP(models.Model):
     user = models.ForeignKey(ApplicationUser, on_delete=models.CASCADE)
@@ -89,6 +179,13 @@ class UserOTP(models.Model):
         ),
     )
 
+    objects = UserOTPQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'expiration_time'], name='userotp_user_expiry_idx'),
+        ]
+
     def save(self, *args, **kwargs):
         self.expiration_time = set_otp_expiration_time()
         return super().save()
@@ -104,3 +201,33 @@ class PasswordResetId(models.Model):
 
     class Meta:
         verbose_name = 'Password reset id'
+
+
+class OutboundEmail(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipient_list = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Outbound email'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbound_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.id} : {self.subject} - {self.status}'
@@ -0,0 +1,151 @@
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from accounts.models import UserOTP
+from accounts.utils import set_otp_expiration_time
+
+OTPRecord = namedtuple('OTPRecord', ('otp', 'expiration_time', 'is_verified'))
+
+_store = None
+
+
+class BaseOTPStore:
+    """
+    Keeps the latest OTP issued to each user. `latest` returns an object
+    with `otp`, `expiration_time` and `is_verified` attributes, or None when
+    there is none or it has expired.
+    """
+
+    def issue(self, user, otp):
+        raise NotImplementedError('Subclasses of BaseOTPStore must implement issue()')
+
+    def latest(self, user):
+        raise NotImplementedError('Subclasses of BaseOTPStore must implement latest()')
+
+    def mark_verified(self, user, record):
+        raise NotImplementedError('Subclasses of BaseOTPStore must implement mark_verified()')
+
+    def discard(self, user, record):
+        raise NotImplementedError('Subclasses of BaseOTPStore must implement discard()')
+
+    # Async variants for the async views. Stores without native async
+    # support run the sync method in a worker thread.
+
+    async def aissue(self, user, otp):
+        return await sync_to_async(self.issue)(user, otp)
+
+    async def alatest(self, user):
+        return await sync_to_async(self.latest)(user)
+
+    async def amark_verified(self, user, record):
+        return await sync_to_async(self.mark_verified)(user, record)
+
+    async def adiscard(self, user, record):
+        return await sync_to_async(self.discard)(user, record)
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    def issue(self, user, otp):
+        return UserOTP.objects.create(user=user, otp=otp)
+
+    def latest(self, user):
+        return UserOTP.objects.latest_live(user)
+
+    def mark_verified(self, user, record):
+        UserOTP.objects.filter(pk=record.pk).update(is_verified=True)
+
+    def discard(self, user, record):
+        UserOTP.objects.filter(pk=record.pk).delete()
+
+    async def aissue(self, user, otp):
+        return await UserOTP.objects.acreate(user=user, otp=otp)
+
+    async def alatest(self, user):
+        return await UserOTP.objects.alatest_live(user)
+
+    async def amark_verified(self, user, record):
+        await UserOTP.objects.filter(pk=record.pk).aupdate(is_verified=True)
+
+    async def adiscard(self, user, record):
+        await UserOTP.objects.filter(pk=record.pk).adelete()
+
+
+class CacheOTPStore(BaseOTPStore):
+    """
+    One cache key per user that expires natively with the OTP, so issue and
+    verify are single key operations and nothing is left behind to purge.
+    """
+    key_prefix = 'otp'
+
+    @property
+    def cache(self):
+        return caches[settings.OTP_STORE_CACHE_ALIAS]
+
+    def make_key(self, user):
+        return f'{self.key_prefix}:{user.pk}'
+
+    @staticmethod
+    def remaining_seconds(expiration_time):
+        return max(int((expiration_time - timezone.now()).total_seconds()), 1)
+
+    def new_record(self, otp):
+        return OTPRecord(otp=otp, expiration_time=set_otp_expiration_time(), is_verified=False)
+
+    def issue(self, user, otp):
+        record = self.new_record(otp)
+        self.cache.set(
+            self.make_key(user), tuple(record),
+            self.remaining_seconds(record.expiration_time),
+        )
+        return record
+
+    @staticmethod
+    def live_record(value):
+        # With less than a second left the key outlives the OTP, see
+        # remaining_seconds.
+        record = OTPRecord(*value) if value else None
+        return record if record and record.expiration_time > timezone.now() else None
+
+    def latest(self, user):
+        return self.live_record(self.cache.get(self.make_key(user)))
+
+    def mark_verified(self, user, record):
+        self.cache.set(
+            self.make_key(user), tuple(record._replace(is_verified=True)),
+            self.remaining_seconds(record.expiration_time),
+        )
+
+    def discard(self, user, record):
+        self.cache.delete(self.make_key(user))
+
+    async def aissue(self, user, otp):
+        record = self.new_record(otp)
+        await self.cache.aset(
+            self.make_key(user), tuple(record),
+            self.remaining_seconds(record.expiration_time),
+        )
+        return record
+
+    async def alatest(self, user):
+        return self.live_record(await self.cache.aget(self.make_key(user)))
+
+    async def amark_verified(self, user, record):
+        await self.cache.aset(
+            self.make_key(user), tuple(record._replace(is_verified=True)),
+            self.remaining_seconds(record.expiration_time),
+        )
+
+    async def adiscard(self, user, record):
+        await self.cache.adelete(self.make_key(user))
+
+
+def get_otp_store():
+    global _store
+    if _store is None:
+        _store = import_string(settings.OTP_STORE)()
+    return _store
@@ -1,6 +1,10 @@
+from django.db.models import Q
 from rest_framework import permissions
 
 
 class IsSelf(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return obj == request.user
+
+    def scope(self, request, view):
+        return Q(pk=request.user.pk)
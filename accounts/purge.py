@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.utils import timezone
+
+from accounts.models import PasswordResetId, UserOTP
+
+logger = logging.getLogger(__name__)
+
+PURGE_MODELS = (UserOTP, PasswordResetId)
+LOCK_KEY = 'accounts:purge-expired'
+
+_scheduler = None
+
+
+class PurgeResult:
+    def __init__(self, model):
+        self.model = model
+        self.deleted = 0
+        self.chunks = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.deleted / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (
+            f'{self.model._meta.label}: removed {self.deleted} row(s) in '
+            f'{self.chunks} chunk(s), {self.elapsed:.2f}s '
+            f'({self.rows_per_second:.0f} rows/s)'
+        )
+
+
+def purge_expired(model, chunk_size=None, pause=0, now=None):
+    """
+    Delete rows of `model` whose `expiration_time` has passed, walking the
+    primary key in ascending chunks so each DELETE only locks a bounded
+    key range.
+    """
+    chunk_size = chunk_size or settings.PURGE_CHUNK_SIZE
+    now = now or timezone.now()
+    result = PurgeResult(model)
+    expired = model.objects.filter(expiration_time__lte=now)
+    last_pk = None
+    started = time.perf_counter()
+
+    while True:
+        queryset = expired if last_pk is None else expired.filter(pk__gt=last_pk)
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            break
+
+        deleted, _ = model.objects.filter(
+            pk__gte=pks[0], pk__lte=pks[-1], expiration_time__lte=now
+        ).delete()
+        result.deleted += deleted
+        result.chunks += 1
+        last_pk = pks[-1]
+
+        if pause:
+            time.sleep(pause)
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def purge_all(chunk_size=None, pause=0):
+    now = timezone.now()
+    return [purge_expired(model, chunk_size, pause, now) for model in PURGE_MODELS]
+
+
+class PurgeScheduler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(daemon=True, name='purge-expired')
+        self.interval = interval
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.tick()
+
+    def tick(self):
+        """
+        Purge unless another worker's scheduler already did in the last
+        `interval` seconds: each web worker process runs a scheduler, and
+        the one that takes the lock in `PURGE_LOCK_CACHE_ALIAS` purges.
+        """
+        if not caches[settings.PURGE_LOCK_CACHE_ALIAS].add(LOCK_KEY, self.name, timeout=self.interval):
+            return False
+        try:
+            for result in purge_all():
+                logger.info('Purge expired : %s', result)
+        except Exception:
+            logger.exception('Error in purge expired')
+        finally:
+            connections.close_all()
+        return True
+
+    def stop(self):
+        self.stop_event.set()
+
+
+def start_purge_scheduler():
+    """
+    Start the in-process purge loop when `PURGE_EXPIRED_INTERVAL` is set.
+    Called from the WSGI/ASGI entry points so management commands never
+    start it. Off by default: prefer running `manage.py purge_expired` from
+    cron, see the README.
+    """
+    global _scheduler
+    interval = settings.PURGE_EXPIRED_INTERVAL
+    if not interval or _scheduler is not None:
+        return _scheduler
+    _scheduler = PurgeScheduler(interval)
+    _scheduler.start()
+    return _scheduler
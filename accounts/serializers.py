@@ -1,15 +1,25 @@
+import logging
+
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
-from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.serializerfields import PhoneNumberField
 from rest_framework import serializers
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.models import ApplicationUser
+from accounts.mail import enqueue_email
+from accounts.otp_store import get_otp_store
+from accounts.tokens import AccountRefreshToken
+from accounts.utils import generate_otp, send_otp
+from config.instrumentation import TimedListSerializer, TimedSerializerMixin
 
-from accounts.models import ApplicationUser, UserOTP
-from accounts.utils import generate_otp, send_email, send_otp
+logger = logging.getLogger(__name__)
 
 
-class RegistrationSerializer(serializers.ModelSerializer):
+class RegistrationSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ApplicationUser
         fields = (
@@ -31,13 +41,18 @@ class RegistrationSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         password = validated_data.pop('password', None)
+        # Already hashed off the request thread by the async registration view.
+        encoded_password = validated_data.pop('encoded_password', None)
         user = super().create(validated_data)
-        user.set_password(password)
+        if encoded_password:
+            user.password = encoded_password
+        else:
+            user.set_password(password)
         user.save(update_fields=['password'])
 
         try:
             otp = generate_otp()
-            UserOTP.objects.create(user=user, otp=otp)
+            get_otp_store().issue(user=user, otp=otp)
 
             subject = "Email Verification"
             message = (
@@ -48,12 +63,12 @@ class RegistrationSerializer(serializers.ModelSerializer):
             )
             recipient_list = [user.email]
 
-            send_email(
+            enqueue_email(
                 subject=subject, message=message, recipient_list=recipient_list
             )
 
-        except Exception as e:
-            print('Error in registration:', e)
+        except Exception:
+            logger.exception('Error in registration')
 
         return user
 
@@ -83,7 +98,7 @@ class OTPSerializer(serializers.Serializer):
         otp = validate_data.get('otp', None)
 
         try:
-            UserOTP.objects.create(user=user, otp=otp)
+            get_otp_store().issue(user=user, otp=otp)
 
             subject = "Email Verification"
             message = (
@@ -93,7 +108,7 @@ class OTPSerializer(serializers.Serializer):
                 f"\n Auth Microservice Team"
             )
             recipient_list = [user.email]
-            send_email(
+            enqueue_email(
                 subject=subject, message=message, recipient_list=recipient_list
             )
         except Exception as e:
@@ -102,6 +117,34 @@ class OTPSerializer(serializers.Serializer):
         return user
 
 
+def check_verification_otp(user_otp, otp):
+    """
+    Checks `otp` against the user's latest OTP (`user_otp`, None when there
+    is none or it has expired) for email verification. Shared with the
+    async endpoint.
+    """
+    if not user_otp:
+        raise serializers.ValidationError(_('OTP does not exist or has expired.'))
+    if user_otp.is_verified:
+        raise serializers.ValidationError(_('Email is already verified.'))
+    if otp != user_otp.otp:
+        raise serializers.ValidationError(_('OTP is invalid!'))
+
+
+def check_login_otp(user_otp, otp):
+    """
+    Checks `otp` against the user's latest OTP (`user_otp`, None when there
+    is none or it has expired) for a phone login. Shared with the async
+    endpoint.
+    """
+    if not user_otp:
+        raise serializers.ValidationError(_('Invalid OTP or OTP expired.'))
+    if user_otp.otp != otp:
+        raise serializers.ValidationError(_('Invalid OTP.'))
+    if user_otp.is_verified:
+        raise serializers.ValidationError(_('OTP has already been used.'))
+
+
 class OTPVerifySerializer(serializers.Serializer):
     otp = serializers.IntegerField(required=True)
     email = serializers.EmailField(
@@ -117,22 +160,10 @@ class OTPVerifySerializer(serializers.Serializer):
         except ApplicationUser.DoesNotExist:
             raise serializers.ValidationError(_('Email does not exist.'))
 
-        user_otp = UserOTP.objects.filter(user=user).last()
-
-        if not user_otp:
-            raise serializers.ValidationError(_('OTP does not exist for this user.'))
-
-        if user_otp.is_verified:
-            raise serializers.ValidationError(_('Email is already verified.'))
-
-        if user_otp.expiration_time < timezone.now():
-            raise serializers.ValidationError(_('OTP has expired.'))
-
-        if otp != user_otp.otp:
-            raise serializers.ValidationError(_('OTP is invalid!'))
-
-        user_otp.is_verified = True
-        user_otp.save()
+        otp_store = get_otp_store()
+        user_otp = otp_store.latest(user)
+        check_verification_otp(user_otp, otp)
+        otp_store.mark_verified(user, user_otp)
 
         return attrs
 
@@ -156,19 +187,19 @@ class SendOTPSerializer(serializers.Serializer):
         otp = validate_data.get('otp', None)
 
         try:
-            UserOTP.objects.create(user=user, otp=otp)
+            get_otp_store().issue(user=user, otp=otp)
         except Exception as e:
             raise serializers.ValidationError(f'{e}')
 
         # Send Sms by Twillio
         try:
             send_otp(user=user, otp=otp)
-        except Exception as e:
-            print(f'{e}')
+        except Exception:
+            logger.exception('Error in send otp')
         return otp
 
 
-class LoginSerializer(serializers.Serializer):
+class LoginSerializer(TimedSerializerMixin, serializers.Serializer):
     email = serializers.EmailField(required=False)
     phone = PhoneNumberField(required=False)
     password = serializers.CharField(required=False)
@@ -200,30 +231,20 @@ class LoginSerializer(serializers.Serializer):
             except ApplicationUser.DoesNotExist:
                 raise serializers.ValidationError(_('User does not exist.'))
 
-            user_otp = UserOTP.objects.filter(user=user).last()
-
-            if user_otp:
-                if user_otp.otp != otp:
-                    raise serializers.ValidationError('Invalid OTP.')
-
-                if user_otp.expiration_time < timezone.now():
-                    raise serializers.ValidationError(_('OTP has expired.'))
-
-                if user_otp.is_verified:
-                    raise serializers.ValidationError(_(''))
-
-                user_otp.delete()
-                attrs['user'] = user
-                return attrs
-            else:
-                raise serializers.ValidationError("Invalid OTP or OTP expired.")
+            otp_store = get_otp_store()
+            user_otp = otp_store.latest(user)
+            check_login_otp(user_otp, otp)
+            otp_store.discard(user, user_otp)
+            attrs['user'] = user
+            return attrs
 
         raise serializers.ValidationError("Invalid combination of credentials.")
 
 
-class AccountsSerializer(serializers.ModelSerializer):
+class AccountsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ApplicationUser
+        list_serializer_class = TimedListSerializer
         fields = (
             'id', 'email', 'phone', 'first_name',
             'last_name', 'date_joined', 'username',
@@ -237,7 +258,41 @@ class AccountsSerializer(serializers.ModelSerializer):
         read_only_fields = ('date_joined', 'id', 'username', 'email', 'role')
 
     def update(self, instance, validated_data):
+        # ModelSerializer.update saves every column; only write the ones sent.
+        update_fields = set(validated_data)
         password = validated_data.pop('password', None)
         if password:
             instance.set_password(password)
-        return super().update(instance, validated_data)
+            instance.token_version += 1
+            update_fields.add('token_version')
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=update_fields)
+        return instance
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    token_class = AccountRefreshToken
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    token_class = AccountRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        try:
+            refresh.refresh_claims(refresh.current_claims().first())
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        # jwt_serializers.TokenRefreshSerializer.validate, on the token with
+        # the claims just reloaded instead of a fresh copy of the old one.
+        data = {'access': str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return data
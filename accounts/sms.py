@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from config.instrumentation import external_call
+
+logger = logging.getLogger(__name__)
+
+_backend = None
+_executor = None
+_lock = threading.Lock()
+# Strong references to in-flight `adispatch_sms` tasks, which the event loop
+# itself only holds weakly.
+_tasks = set()
+
+
+class BaseSMSBackend:
+    def send(self, to, body):
+        raise NotImplementedError('Subclasses of BaseSMSBackend must implement send()')
+
+    async def asend(self, to, body):
+        return await sync_to_async(self.send, thread_sensitive=False)(to, body)
+
+
+class TwilioSMSBackend(BaseSMSBackend):
+    """
+    Sends SMS through one long-lived Twilio client, so every message reuses
+    the same pooled keep-alive HTTP session instead of a new TLS handshake.
+    """
+
+    def __init__(self):
+        from twilio.http.http_client import TwilioHttpClient
+
+        self.client = self.make_client(TwilioHttpClient(
+            pool_connections=True,
+            timeout=settings.SMS_TIMEOUT,
+            max_retries=settings.SMS_MAX_RETRIES,
+        ))
+        self.async_client = None
+        self.async_loop = None
+
+    @staticmethod
+    def make_client(http_client):
+        from twilio.rest import Client
+
+        return Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN, http_client=http_client)
+
+    def get_async_client(self):
+        # The aiohttp session behind the async client belongs to the event
+        # loop it was created on.
+        from twilio.http.async_http_client import AsyncTwilioHttpClient
+
+        loop = asyncio.get_running_loop()
+        if self.async_loop is not loop:
+            self.async_client = self.make_client(AsyncTwilioHttpClient(
+                pool_connections=True,
+                timeout=settings.SMS_TIMEOUT,
+                max_retries=settings.SMS_MAX_RETRIES,
+            ))
+            self.async_loop = loop
+        return self.async_client
+
+    def send(self, to, body):
+        with external_call('twilio'):
+            return self.client.messages.create(
+                body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to
+            )
+
+    async def asend(self, to, body):
+        with external_call('twilio'):
+            return await self.get_async_client().messages.create_async(
+                body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to
+            )
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    """
+    Keeps messages in memory instead of sending them, for tests and offline
+    throughput runs.
+    """
+    outbox = []
+
+    def send(self, to, body):
+        self.outbox.append({'to': to, 'body': body})
+        return len(self.outbox)
+
+    async def asend(self, to, body):
+        return self.send(to, body)
+
+
+def get_sms_backend():
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = import_string(settings.SMS_BACKEND)()
+    return _backend
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.SMS_DISPATCH_WORKERS,
+                    thread_name_prefix='sms-dispatch',
+                )
+    return _executor
+
+
+def reset_sms_backend():
+    """
+    Drop the cached backend so the next send picks up changed settings.
+    """
+    global _backend
+    with _lock:
+        _backend = None
+
+
+def send_sms(to, body):
+    return get_sms_backend().send(to=f'{to}', body=body)
+
+
+def _report_failure(future):
+    error = future.exception()
+    if error is not None:
+        logger.error('Error in sms dispatch: %s', error, exc_info=error)
+
+
+def dispatch_sms(to, body):
+    """
+    Hand the message to the dispatch pool and return a future without
+    waiting for the gateway to respond.
+    """
+    future = get_executor().submit(send_sms, to, body)
+    future.add_done_callback(_report_failure)
+    return future
+
+
+async def asend_sms(to, body):
+    return await get_sms_backend().asend(to=f'{to}', body=body)
+
+
+def _finish_task(task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        error = task.exception()
+        logger.error('Error in sms dispatch: %s', error, exc_info=error)
+
+
+def adispatch_sms(to, body):
+    """
+    `dispatch_sms` for async views: sends the message from a task on the
+    running event loop instead of a dispatch pool thread.
+    """
+    task = asyncio.get_running_loop().create_task(asend_sms(to, body))
+    _tasks.add(task)
+    task.add_done_callback(_finish_task)
+    return task
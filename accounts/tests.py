@@ -1,3 +1,657 @@
-from django.test import TestCase
+import asyncio
+import threading
+from concurrent.futures import Future
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import mail
+from django.core.cache import caches
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from accounts import hashing, otp_store, sms
+from accounts.authentication import ClaimsUser, StatelessJWTAuthentication
+from accounts.blacklist import BlacklistCache
+from accounts.mail import EmailDispatcher, enqueue_email
+from accounts.models import ApplicationUser, OutboundEmail, UserOTP
+from accounts.purge import PurgeScheduler, purge_expired
+from accounts.serializers import OTPVerifySerializer
+from accounts.throttling import CounterStore
+from accounts.tokens import AccountRefreshToken
+from config.test_runner import has_lagging_replica
+
+
+@override_settings(OTP_STORE='accounts.otp_store.DatabaseOTPStore')
+class UserOTPLookupTests(TestCase):
+    def setUp(self):
+        otp_store._store = None
+        self.user = ApplicationUser.objects.create_user(
+            username='otp-user', email='otp-user@example.com', password='pass-1234!'
+        )
+
+    def test_latest_live_is_one_query(self):
+        UserOTP.objects.create(user=self.user, otp=1111)
+        latest = UserOTP.objects.create(user=self.user, otp=2222)
+
+        with self.assertNumQueries(1):
+            user_otp = UserOTP.objects.latest_live(self.user)
+            self.assertEqual(user_otp.pk, latest.pk)
+            self.assertEqual(user_otp.otp, 2222)
+            self.assertFalse(user_otp.is_verified)
+            self.assertGreater(user_otp.expiration_time, timezone.now())
+
+    def test_latest_live_skips_expired(self):
+        user_otp = UserOTP.objects.create(user=self.user, otp=1111)
+        UserOTP.objects.filter(pk=user_otp.pk).update(
+            expiration_time=timezone.now() - timezone.timedelta(minutes=1)
+        )
+
+        self.assertIsNone(UserOTP.objects.latest_live(self.user))
+
+    def test_verification_reads_otp_in_one_query(self):
+        UserOTP.objects.create(user=self.user, otp=1234)
+        serializer = OTPVerifySerializer(data={'email': self.user.email, 'otp': 1234})
+
+        # User lookup, latest OTP lookup and the is_verified update.
+        with self.assertNumQueries(3):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+        self.assertTrue(UserOTP.objects.get(user=self.user).is_verified)
+
+    def test_expired_otp_reads_as_missing(self):
+        user_otp = UserOTP.objects.create(user=self.user, otp=1234)
+        UserOTP.objects.filter(pk=user_otp.pk).update(
+            expiration_time=timezone.now() - timezone.timedelta(minutes=1)
+        )
+        serializer = OTPVerifySerializer(data={'email': self.user.email, 'otp': 1234})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors, {'non_field_errors': ['OTP does not exist or has expired.']})
+
+    def test_cache_store_hides_otps_in_their_last_second(self):
+        store = otp_store.CacheOTPStore()
+        record = store.issue(self.user, 1234)
+        self.assertEqual(store.latest(self.user), record)
+
+        # The key is kept for at least a second, past the OTP's expiry.
+        expired = record._replace(expiration_time=timezone.now() + timezone.timedelta(milliseconds=100))
+        store.cache.set(store.make_key(self.user), tuple(expired), 1)
+        with mock.patch('accounts.otp_store.timezone.now', return_value=expired.expiration_time):
+            self.assertIsNone(store.latest(self.user))
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.dispatcher = EmailDispatcher(batch_size=10, max_attempts=3, retry_backoff=30, lease=60)
+        self.email = enqueue_email('Subject', 'Body', ['to@example.com'])
+
+    def test_claim_leases_due_emails(self):
+        OutboundEmail.objects.create(
+            subject='Later', message='Body', recipient_list=['to@example.com'],
+            next_attempt_at=timezone.now() + timezone.timedelta(minutes=5),
+        )
+        self.assertEqual([email.pk for email in self.dispatcher.claim_batch()], [self.email.pk])
+        self.email.refresh_from_db()
+        self.assertGreater(self.email.next_attempt_at, timezone.now() + timezone.timedelta(seconds=50))
+        # Leased, so another worker doesn't claim it too.
+        self.assertEqual(self.dispatcher.claim_batch(), [])
+
+    def test_lease_expiry_makes_an_email_due_again(self):
+        self.dispatcher.claim_batch()
+        # The worker holding the lease died and the lease ran out.
+        OutboundEmail.objects.filter(pk=self.email.pk).update(
+            next_attempt_at=timezone.now() - timezone.timedelta(seconds=1),
+        )
+        self.assertEqual([email.pk for email in self.dispatcher.claim_batch()], [self.email.pk])
+
+    def test_drain_sends_and_marks_sent(self):
+        self.assertEqual(self.dispatcher.drain(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['to@example.com'])
+        self.email.refresh_from_db()
+        self.assertEqual((self.email.status, self.email.attempts), (OutboundEmail.STATUS_SENT, 1))
+
+    def test_failures_back_off_then_fail(self):
+        with mock.patch.object(EmailDispatcher, 'send', side_effect=OSError('Connection refused')):
+            for attempt, backoff in ((1, 30), (2, 60)):
+                started = timezone.now()
+                self.assertEqual(self.dispatcher.drain(), (0, 1))
+                self.email.refresh_from_db()
+                self.assertEqual(self.email.status, OutboundEmail.STATUS_PENDING)
+                self.assertEqual(self.email.attempts, attempt)
+                self.assertAlmostEqual(
+                    (self.email.next_attempt_at - started).total_seconds(), backoff, delta=5,
+                )
+                # Not due again until the backoff has passed.
+                self.assertEqual(self.dispatcher.drain(), (0, 0))
+                OutboundEmail.objects.filter(pk=self.email.pk).update(next_attempt_at=timezone.now())
+
+            self.assertEqual(self.dispatcher.drain(), (0, 1))
+        self.email.refresh_from_db()
+        self.assertEqual(self.email.status, OutboundEmail.STATUS_FAILED)
+        self.assertEqual(self.email.last_error, 'Connection refused')
+        self.assertEqual(self.dispatcher.drain(), (0, 0))
+
+
+class PurgeExpiredTests(TestCase):
+    def setUp(self):
+        caches[settings.PURGE_LOCK_CACHE_ALIAS].clear()
+        self.user = ApplicationUser.objects.create_user(username='purged', email='purged@example.com')
+
+    def create_otps(self, *expired):
+        past = timezone.now() - timezone.timedelta(minutes=1)
+        otps = [UserOTP.objects.create(user=self.user, otp=1000 + i) for i in range(len(expired))]
+        UserOTP.objects.filter(pk__in=[otp.pk for otp, gone in zip(otps, expired) if gone]).update(
+            expiration_time=past,
+        )
+        return [otp.pk for otp, gone in zip(otps, expired) if not gone]
+
+    def test_chunks_only_delete_expired_rows_in_their_key_range(self):
+        # Live rows sit between the expired ones inside each chunk's range.
+        live = self.create_otps(True, False, True, True, False, True, True)
+        result = purge_expired(UserOTP, chunk_size=2)
+        self.assertEqual((result.deleted, result.chunks), (5, 3))
+        self.assertEqual(sorted(UserOTP.objects.values_list('pk', flat=True)), live)
+
+    def test_exact_multiple_of_the_chunk_size(self):
+        self.create_otps(True, True, True, True)
+        with self.assertNumQueries(5):
+            result = purge_expired(UserOTP, chunk_size=2)
+        self.assertEqual((result.deleted, result.chunks), (4, 2))
+
+    def test_one_scheduler_purges_per_interval(self):
+        schedulers = [PurgeScheduler(interval=60), PurgeScheduler(interval=60)]
+        with mock.patch('accounts.purge.purge_all', return_value=[]) as purge_all:
+            self.assertEqual([scheduler.tick() for scheduler in schedulers], [True, False])
+        purge_all.assert_called_once_with()
+
+    def test_scheduler_survives_errors_and_stops(self):
+        failed, ran = threading.Event(), threading.Event()
+
+        def purge_all():
+            if not failed.is_set():
+                failed.set()
+                raise RuntimeError('Deadlock found')
+            ran.set()
+            return []
+
+        scheduler = PurgeScheduler(interval=0.01)
+        with mock.patch('accounts.purge.purge_all', purge_all), self.assertLogs('accounts.purge', 'ERROR'):
+            scheduler.start()
+            self.assertTrue(ran.wait(5))
+            scheduler.stop()
+            scheduler.join(5)
+        self.assertFalse(scheduler.is_alive())
+
+
+@override_settings(AUTH_THROTTLE_RATES={}, PASSWORD_HASH_RETRY_AFTER=7)
+class HashPoolTests(TestCase):
+    def setUp(self):
+        # Two slots and an executor that leaves every job pending.
+        self.futures = []
+        executor = mock.Mock()
+        executor.submit.side_effect = self.pending_job
+        for patcher in (
+            mock.patch('accounts.hashing.get_executor', return_value=executor),
+            mock.patch('accounts.hashing._slots', threading.BoundedSemaphore(2)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def pending_job(self, fn, *args):
+        self.futures.append(Future())
+        return self.futures[-1]
+
+    def test_saturated_pool_sheds_until_a_job_finishes(self):
+        hashing.submit(len, 'a')
+        hashing.submit(len, 'b')
+        with self.assertRaises(hashing.HashPoolSaturated) as cm:
+            hashing.submit(len, 'c')
+        self.assertEqual(cm.exception.wait, 7)
+
+        self.futures[0].set_result(1)
+        hashing.submit(len, 'c')
+
+    async def test_saturated_pool_returns_503_with_retry_after(self):
+        await ApplicationUser.objects.acreate(username='busy', email='busy@example.com')
+        hashing.submit(len, 'a')
+        hashing.submit(len, 'b')
+
+        response = await self.async_client.post(
+            '/accounts/async/auth/login/', {'email': 'busy@example.com', 'password': 'Pass-word-12'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '7')
+
+
+class LookupFieldTests(TestCase):
+    def stored(self, user):
+        return ApplicationUser.objects.values_list('username_lookup', 'email_lookup').get(pk=user.pk)
+
+    def test_lookups_follow_save(self):
+        user = ApplicationUser.objects.create_user(username='Mixed.Case', email='Mixed@Example.com')
+        self.assertEqual(self.stored(user), ('mixed.case', 'mixed@example.com'))
+
+        user.username, user.email = 'Renamed', None
+        user.save()
+        self.assertEqual(self.stored(user), ('renamed', None))
+
+    def test_reset_password_email_rejects_non_emails(self):
+        client = APIClient()
+        for email in [123, ['user@example.com'], {'email': 'user@example.com'}, 'not-an-email']:
+            response = client.post('/accounts/registration/reset-password-email/', {'email': email}, format='json')
+            self.assertEqual(response.status_code, 400, email)
+        response = client.post('/accounts/registration/reset-password-email/', ['user@example.com'], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_lookups_follow_update_fields_saves(self):
+        user = ApplicationUser.objects.create_user(username='user', email='user@example.com')
+
+        user.email = 'New@Example.com'
+        user.save(update_fields=['email'])
+        self.assertEqual(self.stored(user), ('user', 'new@example.com'))
+
+        # An unsaved username change leaves the stored lookup matching the
+        # stored username.
+        user.username = 'Unsaved'
+        user.first_name = 'First'
+        user.save(update_fields=['first_name'])
+        self.assertEqual(self.stored(user), ('user', 'new@example.com'))
+
+        user.save(update_fields=('username',))
+        self.assertEqual(self.stored(user), ('unsaved', 'new@example.com'))
+
+
+class AccountScopeTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = ApplicationUser.objects.create_user(username='self', email='self@example.com')
+        self.other = ApplicationUser.objects.create_user(username='other', email='other@example.com')
+        self.client.force_authenticate(self.user)
+
+    def assertOnlySelfFetched(self, queries):
+        for query in queries.captured_queries:
+            if 'FROM "accounts_applicationuser"' in query['sql']:
+                self.assertIn(f'"accounts_applicationuser"."id" = {self.user.pk}', query['sql'])
+
+    def test_list_only_fetches_own_row(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/accounts/')
+        self.assertEqual([account['id'] for account in response.data['results']], [self.user.pk])
+        self.assertOnlySelfFetched(queries)
+
+    def test_other_accounts_are_never_fetched(self):
+        with CaptureQueriesContext(connection) as queries:
+            responses = [
+                self.client.get(f'/accounts/{self.other.pk}/'),
+                self.client.patch(f'/accounts/{self.other.pk}/', {'first_name': 'Changed'}),
+                self.client.delete(f'/accounts/{self.other.pk}/'),
+            ]
+        self.assertEqual([response.status_code for response in responses], [404, 404, 404])
+        self.assertOnlySelfFetched(queries)
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.first_name, '')
+
+
+class BlacklistCacheTests(TestCase):
+    def setUp(self):
+        caches[settings.TOKEN_BLACKLIST_CACHE_ALIAS].clear()
+        user = ApplicationUser.objects.create_user(username='holder', email='holder@example.com')
+        refresh = AccountRefreshToken.for_user(user)
+        self.jti, self.exp = refresh['jti'], refresh['exp']
+
+    def blacklist_elsewhere(self):
+        # As the admin or another service would, leaving the cache alone.
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=self.jti))
+
+    def test_not_revoked_answers_are_cached_briefly(self):
+        blacklist = BlacklistCache(negative_timeout=60)
+        self.assertFalse(blacklist.is_revoked(self.jti, self.exp))
+        with self.assertNumQueries(0):
+            self.assertFalse(blacklist.is_revoked(self.jti, self.exp))
+
+    def test_revocation_elsewhere_is_seen_once_the_negative_entry_expires(self):
+        blacklist = BlacklistCache(negative_timeout=0)
+        self.assertFalse(blacklist.is_revoked(self.jti, self.exp))
+        self.blacklist_elsewhere()
+        self.assertTrue(blacklist.is_revoked(self.jti, self.exp))
+        with self.assertNumQueries(0):
+            self.assertTrue(blacklist.is_revoked(self.jti, self.exp))
+
+
+class TokenClaimsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = ApplicationUser.objects.create_user(
+            username='claims', email='claims@example.com', role='manager',
+        )
+
+    def refresh(self, refresh):
+        return self.client.post('/api/token/refresh/', {'refresh': str(refresh)})
+
+    def test_claims_user_reads_claims_without_a_query(self):
+        user = ClaimsUser(AccountRefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                (user.id, user.role, user.is_staff, user.is_active, user.token_version),
+                (self.user.pk, 'manager', False, True, 0),
+            )
+            self.assertEqual(user, self.user)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'claims@example.com')
+
+    def test_authentication_trusts_claims_and_rejects_inactive_users(self):
+        authentication = StatelessJWTAuthentication()
+        access = AccountRefreshToken.for_user(self.user).access_token
+        with self.assertNumQueries(0):
+            self.assertIsInstance(authentication.get_user(access), ClaimsUser)
+
+        # Tokens issued without the claims fall back to loading the user.
+        legacy = AccessToken(str(RefreshToken.for_user(self.user).access_token))
+        self.assertIsInstance(authentication.get_user(legacy), ApplicationUser)
+
+        self.user.is_active = False
+        inactive = AccountRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {inactive}')
+        response = self.client.get('/accounts/')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'user_inactive')
+
+    def test_changing_claims_bumps_token_version(self):
+        self.user.role = 'employee'
+        self.user.first_name = 'Renamed'
+        self.user.save(update_fields=['first_name'])
+        self.assertEqual(self.user.token_version, 0)
+
+        self.user.save(update_fields=['role'])
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.role, self.user.token_version), ('employee', 1))
+
+        self.user.is_staff = True
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.token_version, 2)
+
+    def test_refresh_rejects_revoked_tokens(self):
+        refresh = AccountRefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+
+        self.user.role = 'admin'
+        self.user.save()
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'Token has been revoked.')
+
+        # Deactivated without going through save(): still refused.
+        refresh = AccountRefreshToken.for_user(self.user)
+        ApplicationUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['detail'], 'User is inactive')
+
+    def test_refresh_issues_current_claims(self):
+        refresh = AccountRefreshToken.for_user(self.user)
+        ApplicationUser.objects.filter(pk=self.user.pk).update(role='employee', is_staff=True)
+
+        response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 200)
+        access = AccessToken(response.data['access'])
+        self.assertEqual((access['role'], access['is_staff']), ('employee', True))
+
+
+@override_settings(AUTH_THROTTLE_RATES={
+    'login': {'ip': '5/m', 'identity': '2/m', 'global': None},
+})
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches[settings.AUTH_THROTTLE_CACHE_ALIAS].clear()
+        self.client = APIClient()
+
+    def login(self, email, ip='10.0.0.1'):
+        return self.client.post(
+            '/accounts/auth/login/', {'email': email, 'password': 'wrong'}, REMOTE_ADDR=ip,
+        )
+
+    def test_identity_limit_applies_across_ips(self):
+        self.assertEqual(self.login('victim@example.com', '10.0.0.1').status_code, 400)
+        self.assertEqual(self.login('VICTIM@example.com', '10.0.0.2').status_code, 400)
+
+        response = self.login('victim@example.com', '10.0.0.3')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+        self.assertEqual(self.login('other@example.com', '10.0.0.3').status_code, 400)
+
+    def test_ip_limit_applies_across_identities(self):
+        for i in range(5):
+            self.assertEqual(self.login(f'user{i}@example.com').status_code, 400)
+        self.assertEqual(self.login('user5@example.com').status_code, 429)
+        self.assertEqual(self.login('user5@example.com', '10.0.0.2').status_code, 400)
+
+
+    def test_forwarded_for_header_does_not_change_the_ip(self):
+        for i in range(5):
+            self.client.post(
+                '/accounts/auth/login/', {'email': f'user{i}@example.com', 'password': 'wrong'},
+                REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR=f'192.0.2.{i}',
+            )
+        self.assertEqual(self.login('user5@example.com').status_code, 429)
+
+    @override_settings(AUTH_THROTTLE_RATES={
+        'login': {'ip': '2/m', 'identity': None, 'global': '3/m'},
+    })
+    def test_requests_refused_per_client_do_not_fill_the_global_limit(self):
+        for _ in range(10):
+            self.login('flood@example.com', '10.0.0.1')
+        self.assertEqual(self.login('user@example.com', '10.0.0.2').status_code, 400)
+        self.assertEqual(self.login('user@example.com', '10.0.0.3').status_code, 429)
+
+class FakeRedis:
+    """Just enough of a redis-py client for CounterStore.hit_redis."""
+
+    def __init__(self):
+        self.data = {}
+        self.executions = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def incr(self, key):
+        self.commands.append(('incr', key))
+
+    def expire(self, key, timeout):
+        self.commands.append(('expire', key))
+
+    def get(self, key):
+        self.commands.append(('get', key))
+
+    def execute(self):
+        self.client.executions += 1
+        data, results = self.client.data, []
+        for command, key in self.commands:
+            if command == 'incr':
+                data[key] = data.get(key, 0) + 1
+            results.append(data.get(key) if command != 'expire' else True)
+        return results
+
+
+@override_settings(CACHES={
+    'throttle': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379/1'},
+})
+class RedisCounterStoreTests(SimpleTestCase):
+    def test_each_hit_is_one_pipeline(self):
+        client = FakeRedis()
+        store = CounterStore('throttle')
+        entries = [('ip:2', 'ip:1', 120), ('identity:2', 'identity:1', 120)]
+        with mock.patch('accounts.throttling.redis_client', return_value=client):
+            store.hit(entries)
+            counts = store.hit(entries)
+        self.assertEqual(client.executions, 2)
+        self.assertEqual(counts, [(2, 0), (2, 0)])
+
+
+@override_settings(
+    OTP_STORE='accounts.otp_store.DatabaseOTPStore',
+    SMS_BACKEND='accounts.sms.LocMemSMSBackend',
+    AUTH_THROTTLE_RATES={},
+)
+class AsyncAuthTests(TestCase):
+    def setUp(self):
+        otp_store._store = None
+        sms.reset_sms_backend()
+        sms.LocMemSMSBackend.outbox.clear()
+        self.user = ApplicationUser.objects.create_user(
+            username='async-user', email='async-user@example.com',
+            phone='+14155550123', password='pass-1234!',
+        )
+
+    def post(self, path, data):
+        return self.async_client.post(path, data, content_type='application/json')
+
+    async def test_send_otp_then_login_with_phone(self):
+        response = await self.post('/accounts/async/auth/send-otp/', {'phone': '+14155550123'})
+        self.assertEqual(response.status_code, 200)
+        otp = response.json()['otp']
+        await asyncio.gather(*sms._tasks)
+        self.assertEqual(sms.LocMemSMSBackend.outbox, [{'to': '+14155550123', 'body': f'OTP is {otp}.'}])
+
+        response = await self.post('/accounts/async/auth/login/', {'phone': '+14155550123', 'otp': otp})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['email'], self.user.email)
+        refresh = AccountRefreshToken(response.json()['refresh'][0], check_revoked=False)
+        self.assertEqual(refresh['role'], self.user.role)
+        self.assertTrue(await self.user.outstandingtoken_set.filter(jti=refresh['jti']).aexists())
+
+        # The OTP is single use.
+        response = await self.post('/accounts/async/auth/login/', {'phone': '+14155550123', 'otp': otp})
+        self.assertEqual(response.json(), {'non_field_errors': ['Invalid OTP or OTP expired.']})
+
+    async def test_otp_used_for_verification_cannot_log_in(self):
+        await UserOTP.objects.acreate(user=self.user, otp=4321, is_verified=True)
+        expected = {'non_field_errors': ['OTP has already been used.']}
+
+        response = await self.post('/accounts/async/auth/login/', {'phone': '+14155550123', 'otp': 4321})
+        self.assertEqual(response.json(), expected)
+        response = await self.async_client.post(
+            '/accounts/auth/login/', {'phone': '+14155550123', 'otp': 4321}, content_type='application/json',
+        )
+        self.assertEqual(response.json(), expected)
+
+    async def test_otp_verify(self):
+        await UserOTP.objects.acreate(user=self.user, otp=1234)
+
+        response = await self.post('/accounts/async/registration/otp-verify/', {'email': self.user.email, 'otp': 1111})
+        self.assertEqual(response.json(), {'non_field_errors': ['OTP is invalid!']})
+
+        response = await self.post('/accounts/async/registration/otp-verify/', {'email': self.user.email, 'otp': 1234})
+        self.assertEqual(response.status_code, 200)
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.is_email_verified)
+
+    async def test_non_object_bodies_are_rejected(self):
+        paths = [
+            '/accounts/async/registration/', '/accounts/async/registration/otp-verify/',
+            '/accounts/async/auth/login/', '/accounts/async/auth/send-otp/', '/accounts/async/token/refresh/',
+        ]
+        for path in paths:
+            for body in ['[]', '"text"', '1', 'null', '{']:
+                response = await self.async_client.post(path, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400, (path, body))
+                self.assertEqual(response.json(), {'detail': 'Invalid JSON body.'})
+
+    async def test_token_refresh_rejects_revoked_tokens(self):
+        refresh = await AccountRefreshToken.afor_user(self.user)
+        response = await self.post('/accounts/async/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+
+        blacklisted = await AccountRefreshToken.afor_user(self.user)
+        await sync_to_async(blacklisted.blacklist)()
+        response = await self.post('/accounts/async/token/refresh/', {'refresh': str(blacklisted)})
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'detail': 'Token is blacklisted', 'code': 'token_not_valid'})
+
+        self.user.token_version += 1
+        await self.user.asave(update_fields=['token_version'])
+        response = await self.post('/accounts/async/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.json()['detail'], 'Token has been revoked.')
+
+        refresh = await AccountRefreshToken.afor_user(self.user)
+        await ApplicationUser.objects.filter(pk=self.user.pk).aupdate(role='admin')
+        response = await self.post('/accounts/async/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(AccessToken(response.json()['access'])['role'], 'admin')
+
+        await ApplicationUser.objects.filter(pk=self.user.pk).aupdate(is_active=False)
+        response = await self.post('/accounts/async/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.json()['detail'], 'User is inactive')
+
+
+@skipUnless(has_lagging_replica(), "Needs a 'replica' database alias with its own test database.")
+@override_settings(
+    DATABASE_REPLICAS=['replica'],
+    OTP_STORE='accounts.otp_store.DatabaseOTPStore',
+    AUTH_THROTTLE_RATES={},
+)
+class AccountReplicaTests(TestCase):
+    """
+    Nothing is written to the replica test database, so it behaves like a
+    replica that has not caught up with any write yet. The suite runs with
+    replicas off; these tests turn the 'replica' alias on.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        otp_store._store = None
+        self.client = APIClient()
+
+    def test_registration_then_otp_verify_reads_from_the_primary(self):
+        response = self.client.post('/accounts/registration/', {
+            'username': 'new-user', 'email': 'new-user@example.com', 'phone': '+14155550188',
+            'password': 'Pass-word-12', 'first_name': 'New', 'last_name': 'User', 'role': 'employee',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.DATABASE_READ_YOUR_WRITES_COOKIE, response.cookies)
+        user = ApplicationUser.objects.using('default').get(email='new-user@example.com')
+        self.assertFalse(ApplicationUser.objects.using('replica').exists())
+
+        otp = UserOTP.objects.get(user=user).otp
+        response = self.client.post('/accounts/registration/otp-verify/', {'email': user.email, 'otp': otp})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(UserOTP.objects.using('default').get(user=user).is_verified)
+
+        # Unsafe requests read from the primary even without the cookie.
+        self.client.cookies.clear()
+        response = self.client.post('/accounts/registration/otp-verify/', {'email': user.email, 'otp': otp})
+        self.assertEqual(response.json(), {'non_field_errors': ['Email is already verified.']})
+
+    async def test_async_otp_verify_reads_from_the_primary(self):
+        user = await ApplicationUser.objects.acreate(username='async-new', email='async-new@example.com')
+        await UserOTP.objects.acreate(user=user, otp=1234)
+
+        response = await self.async_client.post(
+            '/accounts/async/registration/otp-verify/', {'email': user.email, 'otp': 1234},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(settings.DATABASE_READ_YOUR_WRITES_COOKIE, response.cookies)
+
+    def test_logout_blacklists_on_the_primary(self):
+        user = ApplicationUser.objects.create_user(username='leaving', email='leaving@example.com')
+        refresh = AccountRefreshToken.for_user(user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+
+        response = self.client.delete('/accounts/auth/logout/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 205)
+        self.assertIn(settings.DATABASE_READ_YOUR_WRITES_COOKIE, response.cookies)
+        self.assertTrue(BlacklistedToken.objects.using('default').filter(token__jti=refresh['jti']).exists())
@@ -0,0 +1,208 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+# Brute-force and flood protection for the unauthenticated auth endpoints.
+# Each scope is limited per client IP, per identity (the email or phone the
+# request is about) and globally, using sliding window counters: a request
+# is counted in the current fixed window and the previous window's count is
+# weighted by how much of it still overlaps the sliding window.
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """
+    `'5/m'` -> `(5, 60)`; the period may carry a multiplier, e.g. `'3/10m'`.
+    """
+    num, period = rate.split('/')
+    multiplier = int(period[:-1] or 1)
+    return int(num), multiplier * DURATIONS[period[-1]]
+
+
+REDIS_BACKENDS = ('django.core.cache.backends.redis.RedisCache', 'django_redis.cache.RedisCache')
+
+_redis_clients = {}
+
+
+def redis_client(alias):
+    """
+    redis-py client for the primary of the Redis cache `alias`: django-redis
+    hands out its own; for Django's RedisCache one is built from the first
+    LOCATION and OPTIONS, as that backend does, and kept for the process.
+    """
+    params = settings.CACHES[alias]
+    if params['BACKEND'] == 'django_redis.cache.RedisCache':
+        from django_redis import get_redis_connection
+        return get_redis_connection(alias, write=True)
+
+    client = _redis_clients.get(alias)
+    if client is None:
+        import redis
+        location = params['LOCATION']
+        if isinstance(location, str):
+            location = location.split(',')
+        options = {
+            name: value for name, value in params.get('OPTIONS', {}).items()
+            if name not in ('pool_class', 'parser_class', 'serializer')
+        }
+        client = _redis_clients[alias] = redis.Redis.from_url(location[0], **options)
+    return client
+
+
+class CounterStore:
+    """
+    Atomically increments the current window counter of several keys and
+    reads their previous window counters. On Redis this is one MULTI/EXEC
+    pipeline, i.e. one round trip. Other caches take one atomic `incr` per
+    key plus a `get_many`, several round trips per request, which is fine
+    for development (locmem) but not what production should run on.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.cache = caches[alias]
+
+    def hit(self, entries):
+        """
+        `entries` is a list of `(current_key, previous_key, timeout)`.
+        Returns `(current_count, previous_count)` per entry.
+        """
+        if settings.CACHES[self.alias]['BACKEND'] in REDIS_BACKENDS:
+            return self.hit_redis(entries)
+        return self.hit_generic(entries)
+
+    def hit_redis(self, entries):
+        keys = [
+            (self.cache.make_and_validate_key(current), self.cache.make_and_validate_key(previous), timeout)
+            for current, previous, timeout in entries
+        ]
+        pipeline = redis_client(self.alias).pipeline(transaction=True)
+        for current, previous, timeout in keys:
+            pipeline.incr(current)
+            pipeline.expire(current, timeout)
+            pipeline.get(previous)
+        results = pipeline.execute()
+        return [
+            (results[i], int(results[i + 2] or 0))
+            for i in range(0, len(results), 3)
+        ]
+
+    def hit_generic(self, entries):
+        counts = []
+        for current, previous, timeout in entries:
+            try:
+                count = self.cache.incr(current)
+            except ValueError:
+                # First hit in this window, unless another request just won
+                # the race to create the key.
+                count = 1 if self.cache.add(current, 1, timeout) else self.cache.incr(current)
+            counts.append(count)
+        previous_counts = self.cache.get_many([previous for _, previous, _ in entries])
+        return [
+            (count, previous_counts.get(previous, 0))
+            for count, (_, previous, _) in zip(counts, entries)
+        ]
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    Applies the `ip`, `identity` and `global` rates configured for `scope`
+    in `AUTH_THROTTLE_RATES`, with one `CounterStore.hit` for the per-client
+    limits and one for the global limit. The client IP is taken as DRF's
+    `get_ident` does, so `NUM_PROXIES` must match the deployment. The
+    identity is the first of `identity_fields` present in the request body.
+    """
+    scope = None
+    identity_fields = ()
+
+    def get_rates(self):
+        return settings.AUTH_THROTTLE_RATES.get(self.scope) or {}
+
+    def get_identity(self, data):
+        for field_name in self.identity_fields:
+            value = data.get(field_name) if hasattr(data, 'get') else None
+            if not value:
+                continue
+            value = f'{value}'.strip().lower()
+            if field_name == 'phone':
+                # '+1 (415) 555-0100' and '+14155550100' are the same target.
+                value = ''.join(char for char in value if char.isdigit())
+            return hashlib.md5(f'{field_name}:{value}'.encode()).hexdigest()
+        return None
+
+    def get_limits(self, request, data, kinds):
+        idents = {
+            'ip': self.get_ident(request),
+            'identity': self.get_identity(data),
+            'global': 'all',
+        }
+        for kind, rate in self.get_rates().items():
+            if kind in kinds and rate and idents.get(kind):
+                num, duration = parse_rate(rate)
+                yield f'throttle:{self.scope}:{kind}:{idents[kind]}', num, duration
+
+    def check(self, request, data):
+        """
+        Count the request against its `ip` and `identity` limits, then, if
+        they allow it, against the `global` one, returning True when all of
+        them allow it. Requests refused per client are kept out of the shared
+        bucket so one client can't fill it for everybody else. Also usable
+        from plain Django views.
+        """
+        now = time.time()
+        self.wait_seconds = None
+        for kinds in (('ip', 'identity'), ('global',)):
+            limits = list(self.get_limits(request, data, kinds))
+            if limits and not self.hit(limits, now):
+                return False
+        return True
+
+    def hit(self, limits, now):
+        entries = []
+        for key, num, duration in limits:
+            window = int(now // duration)
+            entries.append((f'{key}:{window}', f'{key}:{window - 1}', duration * 2))
+        counts = CounterStore(settings.AUTH_THROTTLE_CACHE_ALIAS).hit(entries)
+
+        for (key, num, duration), (current, previous) in zip(limits, counts):
+            elapsed = now % duration
+            estimate = previous * (duration - elapsed) / duration + current
+            if estimate > num:
+                remaining = duration - elapsed
+                self.wait_seconds = max(self.wait_seconds or 0, remaining)
+        return self.wait_seconds is None
+
+    def allow_request(self, request, view):
+        return self.check(request, request.data)
+
+    def wait(self):
+        return getattr(self, 'wait_seconds', None)
+
+
+class LoginThrottle(AuthRateThrottle):
+    scope = 'login'
+    identity_fields = ('email', 'phone')
+
+
+class SendOTPThrottle(AuthRateThrottle):
+    scope = 'send_otp'
+    identity_fields = ('phone',)
+
+
+class ResendOTPThrottle(AuthRateThrottle):
+    scope = 'resend_otp'
+    identity_fields = ('email',)
+
+
+class OTPVerifyThrottle(AuthRateThrottle):
+    scope = 'otp_verify'
+    identity_fields = ('email',)
+
+
+class ResetPasswordThrottle(AuthRateThrottle):
+    scope = 'reset_password_email'
+    identity_fields = ('email',)
@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from accounts.blacklist import blacklist_cache
+
+
+class AccountRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user claims needed to authorize a request
+    without loading the user row. Claims are copied onto the access token.
+
+    On refresh the claims are reloaded from the user row, see
+    `refresh_claims`, so a new access token never repeats stale ones.
+
+    Blacklist checks are answered by `blacklist_cache`; blacklisting writes
+    to the database first and then through to the cache.
+    """
+
+    def __init__(self, token=None, verify=True, check_revoked=True):
+        # With check_revoked=False the blacklist lookup is left to the
+        # caller, see `averify`.
+        self.check_revoked = check_revoked
+        super().__init__(token, verify)
+
+    @staticmethod
+    def add_user_claims(token, user):
+        token['role'] = user.role
+        token['is_staff'] = user.is_staff
+        token['is_active'] = user.is_active
+        token['token_version'] = user.token_version
+        return token
+
+    def current_claims(self):
+        """
+        Queryset loading the claims of the token's user as they are now, one
+        row or none. Evaluate it with `.first()` or `.afirst()`.
+        """
+        return get_user_model().objects.filter(
+            pk=self[api_settings.USER_ID_CLAIM]
+        ).values('role', 'is_staff', 'is_active', 'token_version')
+
+    def refresh_claims(self, claims):
+        """
+        Check the token against the user's `claims` from `current_claims` and
+        copy them onto it, so the derived access token and the rotated refresh
+        token carry current values. Raises TokenError if the token was revoked
+        or the user is gone or inactive.
+        """
+        if claims is None or self.get('token_version', claims['token_version']) != claims['token_version']:
+            raise TokenError(_('Token has been revoked.'))
+        if not claims['is_active']:
+            raise TokenError(_('User is inactive'))
+        for claim, value in claims.items():
+            self[claim] = value
+        return self
+
+    @classmethod
+    def for_user(cls, user):
+        return cls.add_user_claims(super().for_user(user), user)
+
+    @classmethod
+    async def afor_user(cls, user):
+        """
+        `for_user` for async views: builds the same token and records it as
+        outstanding with the async ORM.
+        """
+        # Token.for_user, skipping BlacklistMixin's synchronous insert.
+        token = cls.add_user_claims(super(BlacklistMixin, cls).for_user(user), user)
+        await OutstandingToken.objects.acreate(
+            user=user,
+            jti=token[api_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token['exp']),
+        )
+        return token
+
+    @classmethod
+    async def averify(cls, token):
+        """
+        `cls(token)` for async views: signature, expiry and type are checked
+        inline and the blacklist lookup is awaited.
+        """
+        refresh = cls(token, check_revoked=False)
+        if await blacklist_cache.ais_revoked(refresh.payload[api_settings.JTI_CLAIM], refresh.payload['exp']):
+            raise TokenError(_("Token is blacklisted"))
+        return refresh
+
+    def check_blacklist(self):
+        if not self.check_revoked:
+            return
+        if blacklist_cache.is_revoked(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_cache.mark_revoked(self.payload[api_settings.JTI_CLAIM], self.payload['exp'])
+        return result
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
+from accounts import async_views
 from accounts.views import RegistrationViewSet, AccountAuthViewSet, AccountViewSet
 
 router = SimpleRouter()
@@ -13,5 +14,10 @@ router.register('', AccountViewSet, basename='accounts')
 app_name = 'accounts'
 
 urlpatterns = [
+    path('async/registration/', async_views.registration, name='async_registration'),
+    path('async/registration/otp-verify/', async_views.otp_verify, name='async_otp_verify'),
+    path('async/auth/login/', async_views.login, name='async_login'),
+    path('async/auth/send-otp/', async_views.send_otp, name='async_send_otp'),
+    path('async/token/refresh/', async_views.token_refresh, name='async_token_refresh'),
     path('', include(router.urls)),
 ]
@@ -1,3 +1,5 @@
+import logging
+
 from django.contrib.sites.shortcuts import get_current_site
 from rest_framework import viewsets, status, permissions, serializers
 from rest_framework.decorators import action
@@ -5,7 +7,6 @@ from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 
 from accounts.models import ApplicationUser, PasswordResetId
 from accounts.permissions import IsSelf
@@ -17,7 +18,30 @@ from accounts.serializers import (
     LoginSerializer,
     AccountsSerializer
 )
-from accounts.utils import send_email
+from accounts.throttling import (
+    LoginThrottle,
+    OTPVerifyThrottle,
+    ResendOTPThrottle,
+    ResetPasswordThrottle,
+    SendOTPThrottle,
+)
+from accounts.tokens import AccountRefreshToken
+from accounts.mail import enqueue_email
+from config.permissions import ScopedQuerysetMixin
+
+logger = logging.getLogger(__name__)
+
+
+def login_payload(user):
+    # Create Token using JWT
+    return token_payload(user, AccountRefreshToken.for_user(user))
+
+
+def token_payload(user, refresh):
+    user_details = AccountsSerializer(instance=user).data
+    user_details["refresh"] = str(refresh),
+    user_details["access"] = str(refresh.access_token),
+    return user_details
 
 
 class RegistrationViewSet(viewsets.ViewSet):
@@ -30,7 +54,7 @@ class RegistrationViewSet(viewsets.ViewSet):
         serializer.save()
         return Response({'detail': 'OTP send successfully.'}, status=status.HTTP_201_CREATED)
 
-    @action(methods=['post'], detail=False,
+    @action(methods=['post'], detail=False, throttle_classes=[ResendOTPThrottle],
             url_path='resent-otp', url_name='resend_otp')
     def resend_otp(self, request, *args, **kwargs):
         serializer = OTPSerializer(data=request.data)
@@ -39,6 +63,7 @@ class RegistrationViewSet(viewsets.ViewSet):
         return Response({'detail': 'OTP resend successfully.'}, status=status.HTTP_200_OK)
 
     @action(methods=['post'], detail=False, serializer_class=OTPVerifySerializer,
+            throttle_classes=[OTPVerifyThrottle],
             url_path='otp-verify', url_name='otp_verify')
     def otp_verify(self, request, *args, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -46,18 +71,20 @@ class RegistrationViewSet(viewsets.ViewSet):
         validated_data = serializer.validated_data
         user = ApplicationUser.objects.get(email=validated_data['email'])
         user.is_email_verified = True
-        user.save()
+        user.save(update_fields=['is_email_verified'])
         return Response({'detail': 'Email verified successfully.'}, status=status.HTTP_200_OK)
 
     @action(methods=['post'], detail=False,
             permission_classes=[permissions.AllowAny, ],
+            throttle_classes=[ResetPasswordThrottle],
             url_path='reset-password-email', url_name='reset_password_email')
     def reset_password_email(self, request, *args, **kwargs):
-        user_email = request.data.get('email')
+        user_email = request.data.get('email') if isinstance(request.data, dict) else None
         if not user_email:
             raise serializers.ValidationError("Email field is required.")
+        user_email = serializers.EmailField().run_validation(user_email)
 
-        user = ApplicationUser.objects.filter(email__iexact=user_email).first()
+        user = ApplicationUser.objects.filter(email_lookup=user_email.lower()).first()
         if not user:
             raise NotFound("User doesn't exists.")
 
@@ -76,13 +103,13 @@ class RegistrationViewSet(viewsets.ViewSet):
             )
             recipient_list = [user.email]
 
-            send_email(
+            enqueue_email(
                 subject=subject,
                 message=message,
                 recipient_list=recipient_list
             )
-        except Exception as e:
-            print('Error in reset_password_email :', e)
+        except Exception:
+            logger.exception('Error in reset_password_email')
 
         return Response({'detail': "Email has been sent."}, status=status.HTTP_200_OK)
 
@@ -91,6 +118,7 @@ class AccountAuthViewSet(viewsets.ViewSet):
 
     @action(methods=['post'], detail=False,
             permission_classes=[permissions.AllowAny, ],
+            throttle_classes=[SendOTPThrottle],
             url_name='send_otp', url_path='send-otp')
     def send_otp(self, request, *args, **kwargs):
         serializer = SendOTPSerializer(data=request.data)
@@ -101,19 +129,14 @@ class AccountAuthViewSet(viewsets.ViewSet):
 
     @action(methods=['post'], detail=False,
             permission_classes=[permissions.AllowAny, ],
+            throttle_classes=[LoginThrottle],
             url_name='login', url_path='login')
     def login(self, request, *args, **kwargs):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.validated_data.get('user')
 
-        user_details = AccountsSerializer(instance=user).data
-        # Create Token using JWT
-        refresh = RefreshToken.for_user(user)
-        user_details["refresh"] = str(refresh),
-        user_details["access"] = str(refresh.access_token),
-
-        return Response(user_details, status=status.HTTP_200_OK)
+        return Response(login_payload(user), status=status.HTTP_200_OK)
 
     @action(methods=['delete'], detail=False,
             permission_classes=[permissions.IsAuthenticated, ],
@@ -121,13 +144,14 @@ class AccountAuthViewSet(viewsets.ViewSet):
     def logout(self, request, *args, **kwargs):
         refresh_token = request.data.get('refresh')
         try:
-            RefreshToken(str(refresh_token)).blacklist()
+            AccountRefreshToken(str(refresh_token)).blacklist()
         except TokenError:
             raise serializers.ValidationError(f'{TokenError}')
         return Response(status=status.HTTP_205_RESET_CONTENT)
 
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(ScopedQuerysetMixin, viewsets.ModelViewSet):
+    # IsSelf scopes every query to the caller's own row.
     queryset = ApplicationUser.objects.all().order_by('-date_joined')
     serializer_class = AccountsSerializer
     permission_classes = [permissions.IsAuthenticated, IsSelf]
@@ -20,7 +20,8 @@ def password_reset_change_password(request, password_reset_id):
         if forgot_password.is_valid():
             user = User.objects.get(pk=password_reset_obj.user.id)
             user.set_password(forgot_password.cleaned_data['password'])
-            user.save()
+            user.token_version += 1
+            user.save(update_fields=['password', 'token_version'])
             password_reset_obj.delete()
             return redirect('/forgot-password-success/')
     return render(request, 'accounts/forgot-password.html')
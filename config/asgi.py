@@ -12,5 +12,11 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Selects the ASGI database connection defaults in config.settings.
+os.environ.setdefault('DJANGO_ASGI', 'True')
 
 application = get_asgi_application()
+
+from accounts.purge import start_purge_scheduler  # noqa: E402
+
+start_purge_scheduler()
@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+from django.db.utils import OperationalError
+
+# Bounded connection pool for the database backends in this package. Select
+# one with e.g. ENGINE = 'config.backends.mysql' and size it with the
+# POOL_SIZE and POOL_TIMEOUT keys of the database settings.
+
+POOLED_ENGINES = {
+    'django.db.backends.mysql': 'config.backends.mysql',
+    'django.db.backends.sqlite3': 'config.backends.sqlite3',
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolExhausted(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Holds at most `max_size` driver connections, idle or checked out.
+    `acquire` returns the most recently released idle connection, opens a
+    new one while below `max_size`, or waits up to `timeout` seconds for
+    one to be released.
+    """
+
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle = deque()
+        self.size = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, connect):
+        """
+        Return `(connection, reused)`; `connect()` opens a new connection.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            while not self.idle and self.size >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhausted(
+                        f'No database connection became available within {self.timeout}s '
+                        f'({self.max_size} in use).'
+                    )
+                self.condition.wait(remaining)
+            if self.idle:
+                return self.idle.pop(), True
+            self.size += 1
+
+        try:
+            return connect(), False
+        except BaseException:
+            self.forget()
+            raise
+
+    def release(self, connection):
+        with self.condition:
+            self.idle.append(connection)
+            self.condition.notify()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+        self.forget()
+
+    def forget(self):
+        with self.condition:
+            self.size -= 1
+            self.condition.notify()
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = list(self.idle), deque()
+        for connection in idle:
+            self.discard(connection)
+
+
+def get_pool(settings_dict, alias):
+    # Keyed by database name too, so test databases get their own pool.
+    key = (alias, settings_dict['NAME'])
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(
+                max_size=settings_dict.get('POOL_SIZE', 10),
+                timeout=settings_dict.get('POOL_TIMEOUT', 5.0),
+            )
+        return pool
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Takes connections from the alias's `ConnectionPool` and hands them back
+    on close instead of closing them, so the process keeps a bounded set of
+    open connections that every thread shares. Meant for CONN_MAX_AGE = 0:
+    a request checks a connection out on its first query and returns it
+    when it finishes. With CONN_HEALTH_CHECKS, idle connections are checked
+    with `is_usable()` before reuse.
+    """
+    reused_connection = False
+
+    @property
+    def pool(self):
+        return get_pool(self.settings_dict, self.alias)
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        pool = self.pool
+        while True:
+            connection, reused = pool.acquire(lambda: connect(conn_params))
+            if not reused or not self.settings_dict['CONN_HEALTH_CHECKS'] or self.check_usable(connection):
+                self.reused_connection = reused
+                return connection
+            pool.discard(connection)
+
+    def check_usable(self, connection):
+        # is_usable() inspects self.connection.
+        self.connection = connection
+        try:
+            return self.is_usable()
+        finally:
+            self.connection = None
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Only connections in a clean autocommit state go back to the pool.
+        if self.in_atomic_block or self.errors_occurred or self.get_autocommit() != self.settings_dict['AUTOCOMMIT']:
+            with self.wrap_database_errors:
+                self.pool.discard(self.connection)
+        else:
+            self.pool.release(self.connection)
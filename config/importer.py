@@ -0,0 +1,152 @@
+import csv
+import itertools
+import json
+import os
+import time
+from collections import namedtuple
+
+from django.db import transaction
+from rest_framework import serializers
+
+# Streaming bulk import pipeline shared by the per-model importers
+# (accounts.importers.UserImporter, products.importers.ProductImporter):
+#
+#   read_records -> chunked -> importer.build (validate) -> importer.write
+#
+# Every stage is a generator or works on one chunk, so memory use is bounded
+# by the chunk size whatever the input size.
+
+ChunkResult = namedtuple('ChunkResult', 'position imported errors seconds')
+
+
+def read_records(path, format=None):
+    """
+    Return an iterator of one dict per CSV row or NDJSON line. The format
+    defaults to the file extension. The file is opened right away, so a
+    missing or unreadable path raises OSError here, not on first iteration.
+    """
+    format = format or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    return iter_records(open(path, newline='', encoding='utf-8'), format)
+
+
+def iter_records(file, format):
+    with file:
+        if format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        for line in file:
+            line = line.strip()
+            if line:
+                # A malformed line is handed on as-is and reported as that
+                # record's validation error.
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    yield line
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Checkpoint:
+    """
+    Number of input records already handled, persisted after each committed
+    chunk so an interrupted import resumes after the last committed chunk.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        try:
+            with open(self.path) as file:
+                return json.load(file)['position']
+        except FileNotFoundError:
+            return 0
+
+    def save(self, position):
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump({'position': position}, file)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class BaseImporter:
+    """
+    Validates records with `serializer_class` and inserts the valid ones
+    with `bulk_create`. Subclasses set `model` and `serializer_class` and
+    may add set-wise checks in `validate_chunk`.
+    """
+    model = None
+    serializer_class = None
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size
+        # One serializer validates every record, building its fields once.
+        self.serializer = self.serializer_class()
+
+    def validate_record(self, record):
+        if not isinstance(record, dict):
+            raise serializers.ValidationError({'non_field_errors': ['Invalid record.']})
+        return self.serializer.run_validation(record)
+
+    def validate_chunk(self, records, validated, errors):
+        """
+        Hook for checks that need one query per chunk instead of one per
+        record. `validated` maps the chunk index of each valid record to its
+        data; move failures from it into `errors`.
+        """
+
+    def build(self, validated):
+        return [self.model(**attrs) for attrs in validated]
+
+    def write(self, objects):
+        self.model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    def import_chunk(self, records):
+        validated, errors = {}, {}
+        for index, record in enumerate(records):
+            try:
+                validated[index] = self.validate_record(record)
+            except serializers.ValidationError as e:
+                errors[index] = e.detail
+        if validated:
+            self.validate_chunk(records, validated, errors)
+
+        objects = self.build(list(validated.values()))
+        with transaction.atomic():
+            self.write(objects)
+        return len(objects), errors
+
+    def finish(self):
+        pass
+
+
+def run_import(importer, records, chunk_size, checkpoint=None):
+    """
+    Import `records` chunk by chunk, yielding a `ChunkResult` after each
+    chunk is committed. `errors` maps 1-based record numbers in the input to
+    validation errors. Resumes after the position stored in `checkpoint`.
+    """
+    position = checkpoint.load() if checkpoint else 0
+    records = itertools.islice(records, position, None)
+    try:
+        for chunk in chunked(records, chunk_size):
+            started = time.perf_counter()
+            imported, errors = importer.import_chunk(chunk)
+            errors = {position + index + 1: detail for index, detail in sorted(errors.items())}
+            position += len(chunk)
+            if checkpoint:
+                checkpoint.save(position)
+            yield ChunkResult(position, imported, errors, time.perf_counter() - started)
+    finally:
+        importer.finish()
@@ -0,0 +1,250 @@
+import contextvars
+import hmac
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from rest_framework import serializers
+
+from config.metrics import counter, histogram, render_prometheus
+
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+request_seconds = histogram(
+    'http_request_duration_seconds', 'Request latency by view, method and status.',
+)
+db_query_seconds = histogram(
+    'http_request_db_seconds', 'Time spent in database queries per request, by view.',
+)
+db_query_count = histogram(
+    'http_request_db_queries', 'Database queries per request, by view.', buckets=COUNT_BUCKETS,
+)
+serializer_seconds = histogram(
+    'http_request_serializer_seconds', 'Time spent validating and rendering serializers per request, by view.',
+)
+external_call_seconds = histogram(
+    'external_call_duration_seconds', 'Latency of calls to external services (SMTP, Twilio).',
+)
+
+db_connections_opened = counter(
+    'db_connections_opened_total', 'Database connections opened, by alias.',
+)
+db_connections_reused = counter(
+    'db_connections_reused_total', 'Connections checked out of a pooled backend without opening one, by alias.',
+)
+
+_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def count_connection(sender, connection, **kwargs):
+    # Pooled backends (config.backends) flag connections taken from the pool.
+    if getattr(connection, 'reused_connection', False):
+        db_connections_reused.inc(alias=connection.alias)
+    else:
+        db_connections_opened.inc(alias=connection.alias)
+
+
+connection_created.connect(count_connection, dispatch_uid='config.instrumentation.count_connection')
+
+
+class RequestTimings:
+    """
+    Per-request counters, reachable from anywhere in the request through
+    `current_timings()`.
+    """
+
+    def __init__(self):
+        self.db_count = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.external_seconds = {}
+        self.in_serializer = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_seconds += time.perf_counter() - started
+            self.db_count += 1
+
+    def server_timing(self, total):
+        metrics = [
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_count} queries"',
+            f'serializer;dur={self.serializer_seconds * 1000:.1f}',
+        ]
+        metrics += [
+            f'ext-{service};dur={seconds * 1000:.1f}'
+            for service, seconds in self.external_seconds.items()
+        ]
+        metrics.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(metrics)
+
+
+def current_timings():
+    return _timings.get()
+
+
+def time_query(execute, sql, params, many, context):
+    # Execute wrapper left on each connection; inside a sampled request it
+    # feeds that request's timings, which reach sync_to_async threads too.
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings(execute, sql, params, many, context)
+
+
+def instrument_connections():
+    """
+    Add `time_query` to this thread's connections. Async requests run their
+    queries in a sync_to_async thread with connections of its own, so they
+    call this there.
+    """
+    for connection in connections.all():
+        if time_query not in connection.execute_wrappers:
+            connection.execute_wrappers.append(time_query)
+
+
+@contextmanager
+def external_call(service):
+    """
+    Time a call to an external service. Always feeds the histogram, and the
+    request's Server-Timing when called inside a sampled request.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        external_call_seconds.observe(elapsed, service=service)
+        timings = _timings.get()
+        if timings is not None:
+            timings.external_seconds[service] = timings.external_seconds.get(service, 0.0) + elapsed
+
+
+@contextmanager
+def serializer_span():
+    timings = _timings.get()
+    if timings is None or timings.in_serializer:
+        # Nested serializers are counted once, by the outermost one.
+        yield
+        return
+    timings.in_serializer = True
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.serializer_seconds += time.perf_counter() - started
+        timings.in_serializer = False
+
+
+class TimedSerializerMixin:
+    """
+    Adds validation (`is_valid`) and rendering (`data`) time to the
+    request's serializer time. Rendering includes the queries it triggers.
+    """
+
+    def is_valid(self, *args, **kwargs):
+        with serializer_span():
+            return super().is_valid(*args, **kwargs)
+
+    @property
+    def data(self):
+        with serializer_span():
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    pass
+
+
+class PerformanceMiddleware:
+    """
+    Records latency, database queries and serializer time per view for a
+    `METRICS_SAMPLE_RATE` fraction of requests, adding a `Server-Timing`
+    header when `METRICS_SERVER_TIMING` is on. Unsampled requests pay for a
+    random() call and, once a sampled request has added `time_query` to the
+    connections, one context variable lookup per query. Runs sync or async,
+    like the rest of the chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.METRICS_SAMPLE_RATE
+        self.server_timing = settings.METRICS_SERVER_TIMING
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        instrument_connections()
+        timings = RequestTimings()
+        started = time.perf_counter()
+        with self.timing(timings):
+            response = self.get_response(request)
+        return self.record(request, response, timings, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        await sync_to_async(instrument_connections)()
+        timings = RequestTimings()
+        started = time.perf_counter()
+        with self.timing(timings):
+            response = await self.get_response(request)
+        return self.record(request, response, timings, time.perf_counter() - started)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    @contextmanager
+    def timing(self, timings):
+        token = _timings.set(timings)
+        try:
+            yield
+        finally:
+            _timings.reset(token)
+
+    def record(self, request, response, timings, total):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        request_seconds.observe(total, view=view, method=request.method, status=response.status_code)
+        db_query_seconds.observe(timings.db_seconds, view=view)
+        db_query_count.observe(timings.db_count, view=view)
+        serializer_seconds.observe(timings.serializer_seconds, view=view)
+
+        if self.server_timing:
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+
+def metrics_allowed(request):
+    """
+    Scrapes come from `METRICS_ALLOWED_IPS` (REMOTE_ADDR, proxies are not
+    trusted here) or carry `Authorization: Bearer <METRICS_TOKEN>`.
+    """
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and hmac.compare_digest(authorization.encode(), f'Bearer {token}'.encode())
+
+
+def metrics(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
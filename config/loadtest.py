@@ -0,0 +1,289 @@
+import itertools
+import json
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from accounts.models import ApplicationUser, OutboundEmail
+from accounts.sms import LocMemSMSBackend, reset_sms_backend
+from accounts.tokens import AccountRefreshToken
+from config.instrumentation import RequestTimings
+from products.models import Product
+
+# In-process load test of the auth and product endpoints. Every seeded or
+# registered account's username starts with the run id, so the run can clean
+# up after itself on a shared database.
+
+EMAIL_DOMAIN = 'loadtest.invalid'
+PASSWORD = 'Load-test-pass-1'
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[index]
+
+
+class ScenarioStats:
+    def __init__(self):
+        self.latencies = []
+        self.queries = []
+        self.statuses = {}
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, queries, status):
+        with self.lock:
+            self.latencies.append(seconds * 1000)
+            self.queries.append(queries)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status is None or status >= 400:
+                self.errors += 1
+
+    def summary(self, wall_seconds):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'requests': count,
+            'errors': self.errors,
+            'statuses': {f'{status}': n for status, n in sorted(self.statuses.items(), key=str)},
+            'throughput_rps': round(count / wall_seconds, 2) if wall_seconds else None,
+            'latency_ms': {
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+                'mean': sum(latencies) / count if count else None,
+            },
+            'queries_per_request': {
+                'mean': sum(self.queries) / count if count else None,
+                'max': max(self.queries) if count else None,
+            },
+        }
+
+
+class LoadTest:
+    """
+    Seeds `users` accounts (half of them managers) and `products`
+    products, then runs each scenario for `requests` requests spread over
+    `concurrency` threads, each with its own `django.test.Client`. For the
+    duration of the run SMS goes to `LocMemSMSBackend` and the auth
+    throttles are off, since every request comes from one client IP.
+    """
+
+    def __init__(self, users, products, requests, concurrency, host='localhost'):
+        self.user_count = users
+        self.product_count = products
+        self.requests = requests
+        self.concurrency = concurrency
+        self.host = host
+        self.run_id = uuid.uuid4().hex[:8]
+        self.counter = itertools.count()
+        self.local = threading.local()
+        self.scenarios = {
+            'registration': self.registration,
+            'login_email': self.login_email,
+            'send_otp': self.send_otp,
+            'login_phone': self.login_phone,
+            'token_refresh': self.token_refresh,
+            'product_list': self.product_list,
+            'product_create': self.product_create,
+            'account_patch': self.account_patch,
+        }
+
+    # Seeding
+
+    def phone(self, area_code, number):
+        return f'+1{area_code}{2000000 + number:07d}'
+
+    def seed(self, batch_size=1000):
+        encoded = make_password(PASSWORD)
+        self.phone_offset = random.randrange(0, 7000000 - self.user_count)
+        for start in range(0, self.user_count, batch_size):
+            users = []
+            for i in range(start, min(start + batch_size, self.user_count)):
+                user = ApplicationUser(
+                    username=f'lt-{self.run_id}-{i}',
+                    email=f'lt-{self.run_id}-{i}@{EMAIL_DOMAIN}',
+                    phone=self.phone(415, self.phone_offset + i),
+                    password=encoded,
+                    first_name='Load',
+                    last_name='Test',
+                    role='manager' if i % 2 else 'employee',
+                )
+                user.sync_lookup_fields()
+                users.append(user)
+            ApplicationUser.objects.bulk_create(users)
+
+        self.users = list(ApplicationUser.objects.filter(username__startswith=f'lt-{self.run_id}-'))
+        self.managers = [user for user in self.users if user.role == 'manager']
+        self.tokens = {}
+        for user in self.users:
+            refresh = AccountRefreshToken.for_user(user)
+            self.tokens[user.pk] = (f'{refresh}', f'{refresh.access_token}')
+
+        owners = self.managers or self.users
+        for start in range(0, self.product_count, batch_size):
+            Product.objects.bulk_create(
+                Product(
+                    name=f'Load test product {i}',
+                    description='Load test product',
+                    price=Decimal(i % 100),
+                    owner=owners[i % len(owners)],
+                )
+                for i in range(start, min(start + batch_size, self.product_count))
+            )
+
+    def cleanup(self):
+        ApplicationUser.objects.filter(username__startswith=f'lt-{self.run_id}-').delete()
+        OutboundEmail.objects.filter(recipient_list__icontains=f'lt-{self.run_id}-').delete()
+        LocMemSMSBackend.outbox.clear()
+
+    # Requests
+
+    @property
+    def client(self):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(HTTP_HOST=self.host)
+        return client
+
+    def request(self, scenario, method, path, data=None, user=None):
+        headers = {}
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {self.tokens[user.pk][1]}'
+        timings = RequestTimings()
+        started = time.perf_counter()
+        response = None
+        try:
+            with connection.execute_wrapper(timings):
+                response = getattr(self.client, method)(
+                    path, data=data, content_type='application/json', **headers
+                )
+        except Exception:
+            # Counted as an error (status None) instead of ending the run.
+            pass
+        status = response.status_code if response is not None else None
+        self.stats[scenario].record(time.perf_counter() - started, timings.db_count, status)
+        return response
+
+    def pick(self, users):
+        return random.choice(users)
+
+    # Scenarios, each issuing one measured request
+
+    def registration(self):
+        n = next(self.counter)
+        self.request('registration', 'post', '/accounts/registration/', {
+            'username': f'lt-{self.run_id}-r{n}',
+            'email': f'lt-{self.run_id}-r{n}@{EMAIL_DOMAIN}',
+            'phone': self.phone(646, (self.phone_offset + n) % 7000000),
+            'password': PASSWORD,
+            'first_name': 'Load',
+            'last_name': 'Test',
+            'role': 'employee',
+        })
+
+    def login_email(self):
+        user = self.pick(self.users)
+        self.request('login_email', 'post', '/accounts/auth/login/', {
+            'email': user.email, 'password': PASSWORD,
+        })
+
+    def send_otp(self):
+        user = self.pick(self.users)
+        return self.request('send_otp', 'post', '/accounts/auth/send-otp/', {'phone': f'{user.phone}'})
+
+    def login_phone(self):
+        # The OTP request is only setup here, it is measured by send_otp.
+        user = self.pick(self.users)
+        response = self.client.post(
+            '/accounts/auth/send-otp/', data={'phone': f'{user.phone}'}, content_type='application/json',
+        )
+        if response.status_code != 200:
+            self.stats['login_phone'].record(0, 0, None)
+            return
+        self.request('login_phone', 'post', '/accounts/auth/login/', {
+            'phone': f'{user.phone}', 'otp': response.json()['otp'],
+        })
+
+    def token_refresh(self):
+        user = self.pick(self.users)
+        self.request('token_refresh', 'post', '/api/token/refresh/', {'refresh': self.tokens[user.pk][0]})
+
+    def product_list(self):
+        self.request('product_list', 'get', '/products/', user=self.pick(self.users))
+
+    def product_create(self):
+        self.request('product_create', 'post', '/products/', {
+            'name': f'Load test product {next(self.counter)}',
+            'description': 'Load test product',
+            'price': '9.99',
+        }, user=self.pick(self.managers))
+
+    def account_patch(self):
+        user = self.pick(self.users)
+        self.request('account_patch', 'patch', f'/accounts/{user.pk}/', {
+            'first_name': f'Load{next(self.counter)}',
+        }, user=user)
+
+    # Running
+
+    def worker(self, scenario, count):
+        try:
+            for _ in range(count):
+                self.scenarios[scenario]()
+        finally:
+            connections.close_all()
+
+    def run_scenario(self, scenario):
+        self.stats[scenario] = ScenarioStats()
+        shares = [self.requests // self.concurrency] * self.concurrency
+        for i in range(self.requests % self.concurrency):
+            shares[i] += 1
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(self.worker, itertools.repeat(scenario), shares))
+        return self.stats[scenario].summary(time.perf_counter() - started)
+
+    def run(self, scenarios=None, on_result=None):
+        self.stats = {}
+        results = {}
+        with override_settings(SMS_BACKEND='accounts.sms.LocMemSMSBackend', AUTH_THROTTLE_RATES={}):
+            reset_sms_backend()
+            try:
+                for scenario in scenarios or self.scenarios:
+                    results[scenario] = self.run_scenario(scenario)
+                    if on_result:
+                        on_result(scenario, results[scenario])
+            finally:
+                reset_sms_backend()
+        return results
+
+    def report(self, results):
+        return {
+            'run_id': self.run_id,
+            'finished_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'users': self.user_count,
+            'products': self.product_count,
+            'requests_per_scenario': self.requests,
+            'concurrency': self.concurrency,
+            'scenarios': results,
+        }
+
+
+def write_report(report, path):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2, sort_keys=True)
@@ -0,0 +1,144 @@
+import bisect
+import threading
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram with fixed upper bounds, kept per
+    label set.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0,
+                }
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                key: {
+                    'counts': list(series['counts']),
+                    'sum': series['sum'],
+                    'count': series['count'],
+                }
+                for key, series in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """
+    Thread-safe monotonically increasing count, kept per label set.
+    """
+    type = 'counter'
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def register(name, factory):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = factory()
+        return metric
+
+
+def histogram(name, documentation='', buckets=DEFAULT_BUCKETS):
+    """
+    Return the histogram registered under `name`, creating it on first use.
+    """
+    return register(name, lambda: Histogram(name, documentation, buckets))
+
+
+def counter(name, documentation=''):
+    """
+    Return the counter registered under `name`, creating it on first use.
+    """
+    return register(name, lambda: Counter(name, documentation))
+
+
+def registered_metrics():
+    with _registry_lock:
+        return list(_registry.values())
+
+
+def format_labels(labels):
+    return ','.join(f'{name}="{escape_label(value)}"' for name, value in labels)
+
+
+def escape_label(value):
+    return f'{value}'.replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def render_prometheus():
+    """
+    Render every registered metric in the Prometheus text exposition
+    format, version 0.0.4.
+    """
+    lines = []
+    for metric in registered_metrics():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        if metric.type == 'counter':
+            for labels, value in sorted(metric.snapshot().items()):
+                label_text = f'{{{format_labels(labels)}}}' if labels else ''
+                lines.append(f'{metric.name}{label_text} {value}')
+            continue
+        for labels, series in sorted(metric.snapshot().items()):
+            cumulative = 0
+            for bound, count in zip((*metric.buckets, '+Inf'), series['counts']):
+                cumulative += count
+                bucket_labels = format_labels((*labels, ('le', bound)))
+                lines.append(f'{metric.name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_text = f'{{{format_labels(labels)}}}' if labels else ''
+            lines.append(f'{metric.name}_sum{label_text} {series["sum"]}')
+            lines.append(f'{metric.name}_count{label_text} {series["count"]}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,82 @@
+from django.db.models import Q
+from rest_framework.permissions import AND, OR
+
+# Matches no rows; Django answers it without running a query.
+NOTHING = Q(pk__in=[])
+
+
+class PolicyTable:
+    """
+    Declarative action -> permission classes table, compiled once into
+    shared permission instances. The permission classes used here keep no
+    per-request state, so `get_permissions()` can return the same tuple on
+    every request instead of instantiating a new list.
+    """
+
+    def __init__(self, policies, default):
+        self.policies = {action: self.compile(classes) for action, classes in policies.items()}
+        self.default = self.compile(default)
+
+    @staticmethod
+    def compile(classes):
+        return tuple(permission_class() for permission_class in classes)
+
+    def for_action(self, action):
+        return self.policies.get(action, self.default)
+
+
+def union(left, right):
+    if left is None or right is None:
+        return None
+    return left | right
+
+
+def intersection(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    return left & right
+
+
+def object_scope(permission, request, view):
+    """
+    Q object matching the objects `permission.has_object_permission` would
+    allow, or None when it does not narrow them. Permissions opt in with a
+    `scope(request, view)` method; `|` and `&` combinations of them are
+    translated into the matching `|` and `&` of their scopes.
+    """
+    if isinstance(permission, OR):
+        return union(
+            branch_scope(permission.op1, request, view),
+            branch_scope(permission.op2, request, view),
+        )
+    if isinstance(permission, AND):
+        return intersection(
+            object_scope(permission.op1, request, view),
+            object_scope(permission.op2, request, view),
+        )
+    scope = getattr(permission, 'scope', None)
+    return scope(request, view) if scope else None
+
+
+def branch_scope(permission, request, view):
+    # An OR branch only grants object access when its view-level check passes.
+    if not permission.has_permission(request, view):
+        return NOTHING
+    return object_scope(permission, request, view)
+
+
+class ScopedQuerysetMixin:
+    """
+    Filters `get_queryset()` by the scope of the view's permissions, so
+    detail, update, delete and list queries only ever fetch rows the user
+    may access. `has_object_permission` still runs on the fetched object.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        scope = None
+        for permission in self.get_permissions():
+            scope = intersection(scope, object_scope(permission, self.request, self))
+        return queryset if scope is None else queryset.filter(scope)
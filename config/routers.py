@@ -0,0 +1,141 @@
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+# Read/write splitting. Inside a request, reads of the models listed in
+# DATABASE_REPLICA_MODELS go to one of DATABASE_REPLICAS; every write goes to
+# the default (primary) database. Requests with unsafe methods read from the
+# primary throughout, so objects they update are never loaded from a replica
+# that is behind. After a write, the client's requests in the next
+# DATABASE_READ_YOUR_WRITES_SECONDS read from the primary too, so a client
+# reads its own writes despite replica lag. Code running outside a request
+# always uses the primary.
+
+_routing = contextvars.ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned_until=None, primary=False):
+        self.pinned_until = pinned_until
+        self.primary = primary
+        self.wrote = False
+        self.read_replica = False
+
+    @property
+    def pinned(self):
+        return (
+            self.primary or self.wrote
+            or (self.pinned_until is not None and self.pinned_until > time.time())
+        )
+
+
+@contextmanager
+def request_routing(pinned_until=None, primary=False):
+    """
+    Route the database access made inside the block as part of one request;
+    with `primary` every read goes to the primary. Yields the
+    `RoutingState`, whose `wrote` tells whether the block wrote.
+    """
+    state = RoutingState(pinned_until, primary)
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+def current_routing():
+    return _routing.get()
+
+
+def replica_alias():
+    return random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+class ReplicaRouter:
+    """
+    Sends reads of `DATABASE_REPLICA_MODELS` made inside `request_routing()`
+    to a replica unless the request is pinned to the primary, and all writes
+    to the primary, pinning the current request. Replicas are copies of the
+    primary, so relations between objects read from either are allowed.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or state.pinned:
+            return None
+        if model._meta.label in settings.DATABASE_REPLICA_MODELS:
+            alias = replica_alias()
+            state.read_replica = alias is not None
+            return alias
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        # Objects read from a replica are saved to the primary.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReadYourWritesMiddleware:
+    """
+    Routes each request through `ReplicaRouter`, pinning requests with
+    unsafe methods to the primary from the start. After a request that wrote,
+    a signed cookie pins the client's reads to the primary for
+    `DATABASE_READ_YOUR_WRITES_SECONDS`, which should exceed the replicas'
+    usual lag. Runs sync or async, like the rest of the chain.
+    """
+    cookie_salt = 'config.routers.read-your-writes'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = settings.DATABASE_READ_YOUR_WRITES_COOKIE
+        self.window = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def pinned_until(self, request):
+        value = request.get_signed_cookie(
+            self.cookie_name, default=None, salt=self.cookie_salt, max_age=self.window,
+        )
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with request_routing(self.pinned_until(request), self.primary(request)) as state:
+            response = self.get_response(request)
+        return self.pin(response, state)
+
+    async def __acall__(self, request):
+        # Queries run through sync_to_async, which copies this context.
+        with request_routing(self.pinned_until(request), self.primary(request)) as state:
+            response = await self.get_response(request)
+        return self.pin(response, state)
+
+    def primary(self, request):
+        return request.method not in SAFE_METHODS
+
+    def pin(self, response, state):
+        if state.wrote and self.window:
+            response.set_signed_cookie(
+                self.cookie_name, f'{time.time() + self.window}', salt=self.cookie_salt,
+                max_age=self.window, httponly=True, samesite='Lax',
+            )
+        return response
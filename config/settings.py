@@ -33,6 +33,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.instrumentation.PerformanceMiddleware',
+    'config.routers.ReadYourWritesMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -71,17 +73,58 @@ WSGI_APPLICATION = 'config.wsgi.application'
 #     }
 # }
 
+# Connections persist across requests for DB_CONN_MAX_AGE seconds and are
+# pinged before being reused. With DB_POOL, connections are taken from a
+# per-process pool of at most DB_POOL_SIZE instead and handed back as each
+# request finishes (see config.backends.pool). config.asgi sets DJANGO_ASGI:
+# there each request's sync code runs in a thread of its own, which would
+# leave a persistent connection behind, so ASGI defaults to the pool, or to
+# a connection per request with DB_POOL=False.
+ASGI = env.bool('DJANGO_ASGI', default=False)
+DB_POOL = env.bool('DB_POOL', default=ASGI)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'config.backends.mysql' if DB_POOL else 'django.db.backends.mysql',
         'NAME': 'db_dev_auth_microservice',
         'USER': 'root',
         'PASSWORD': '',
         'HOST': '127.0.0.1',
         'PORT': '3306',
+        'CONN_MAX_AGE': 0 if DB_POOL else env.int('DB_CONN_MAX_AGE', default=0 if ASGI else 60),
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
+        'POOL_SIZE': env.int('DB_POOL_SIZE', default=10),
+        'POOL_TIMEOUT': env.float('DB_POOL_TIMEOUT', default=5.0),
     }
 }
 
+# Read replica for the reads routed by config.routers.ReplicaRouter.
+DB_REPLICA_HOST = env('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': env('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['config.routers.ReplicaRouter']
+DATABASE_REPLICA_MODELS = ['products.Product', 'accounts.ApplicationUser']
+# After a write, the client's reads stay on the primary for this long (via a
+# signed cookie); keep it above the replicas' usual lag.
+DATABASE_READ_YOUR_WRITES_SECONDS = env.int('DB_READ_YOUR_WRITES_SECONDS', default=5)
+DATABASE_READ_YOUR_WRITES_COOKIE = 'db_primary'
+
+# Runs the tests with DATABASE_REPLICAS off unless a test turns them on.
+TEST_RUNNER = 'config.test_runner.TestRunner'
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 AUTH_USER_MODEL = 'accounts.ApplicationUser'
 AUTHENTICATION_BACKENDS = (
     'accounts.auth_backends.model_backend.CustomModelBackend',
@@ -90,10 +133,14 @@ AUTHENTICATION_BACKENDS = (
 # Rest Framework config
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    # Reverse proxies in front of the app, i.e. trusted X-Forwarded-For
+    # entries. With 0 the throttles key on REMOTE_ADDR and ignore the
+    # header, which clients can set to anything.
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=0),
 }
 
 # Password validation
@@ -114,6 +161,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# The first hasher hashes new passwords, the rest still verify existing
+# hashes, which are upgraded to the first hasher on the next login.
+# Argon2 requires argon2-cffi.
+PASSWORD_HASHERS = env.list('PASSWORD_HASHERS', default=[
+    'accounts.hashers.TunedPBKDF2PasswordHasher',
+    'accounts.hashers.TunedScryptPasswordHasher',
+    'accounts.hashers.TunedArgon2PasswordHasher',
+])
+PASSWORD_PBKDF2_ITERATIONS = env.int('PASSWORD_PBKDF2_ITERATIONS', default=600000)
+PASSWORD_SCRYPT_WORK_FACTOR = env.int('PASSWORD_SCRYPT_WORK_FACTOR', default=2 ** 14)
+PASSWORD_SCRYPT_BLOCK_SIZE = env.int('PASSWORD_SCRYPT_BLOCK_SIZE', default=8)
+PASSWORD_SCRYPT_PARALLELISM = env.int('PASSWORD_SCRYPT_PARALLELISM', default=1)
+PASSWORD_ARGON2_TIME_COST = env.int('PASSWORD_ARGON2_TIME_COST', default=2)
+PASSWORD_ARGON2_MEMORY_COST = env.int('PASSWORD_ARGON2_MEMORY_COST', default=102400)
+PASSWORD_ARGON2_PARALLELISM = env.int('PASSWORD_ARGON2_PARALLELISM', default=8)
+
+# Process pool used by the async login/registration views for hashing.
+# Requests beyond PASSWORD_HASH_MAX_PENDING get a 503 with Retry-After.
+PASSWORD_HASH_WORKERS = env.int('PASSWORD_HASH_WORKERS', default=2)
+PASSWORD_HASH_MAX_PENDING = env.int('PASSWORD_HASH_MAX_PENDING', default=32)
+PASSWORD_HASH_RETRY_AFTER = env.int('PASSWORD_HASH_RETRY_AFTER', default=1)
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -149,10 +219,69 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=120),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.TokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.TokenRefreshSerializer',
+}
+
+# Throttling of the unauthenticated auth endpoints, per client IP, per
+# email/phone ('identity') and globally. Rates are '<count>/<period>' with
+# s, m, h or d periods, optionally multiplied ('3/10m'); None disables one.
+# Production needs a shared Redis cache: up to two round trips per request there,
+# while other backends take several and locmem counts per process.
+AUTH_THROTTLE_CACHE_ALIAS = 'default'
+AUTH_THROTTLE_RATES = {
+    'login': {'ip': '30/m', 'identity': '5/m', 'global': '3000/m'},
+    'send_otp': {'ip': '10/m', 'identity': '3/10m', 'global': '600/m'},
+    'resend_otp': {'ip': '10/m', 'identity': '3/10m', 'global': '600/m'},
+    'otp_verify': {'ip': '30/m', 'identity': '5/m', 'global': '3000/m'},
+    'reset_password_email': {'ip': '10/m', 'identity': '3/h', 'global': '600/m'},
 }
 
+# Product list/detail response cache, invalidated by product writes. It must
+# be shared by every worker (Redis): `check --deploy` warns about locmem.
+PRODUCT_CACHE_ALIAS = 'default'
+PRODUCT_CACHE_TIMEOUT = env.int('PRODUCT_CACHE_TIMEOUT', default=300)
+
+# Request instrumentation: fraction of requests measured, and whether to
+# expose the timings to clients in a Server-Timing header
+METRICS_SAMPLE_RATE = env.float('METRICS_SAMPLE_RATE', default=1.0)
+METRICS_SERVER_TIMING = env.bool('METRICS_SERVER_TIMING', default=DEBUG)
+# /metrics answers scrapes from these client IPs, or with this bearer token
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', default=['127.0.0.1', '::1'])
+METRICS_TOKEN = env('METRICS_TOKEN', default=None)
+
+# Bulk product endpoints, rows per INSERT/UPDATE and items per request
+PRODUCT_BULK_BATCH_SIZE = env.int('PRODUCT_BULK_BATCH_SIZE', default=500)
+PRODUCT_BULK_MAX_ITEMS = env.int('PRODUCT_BULK_MAX_ITEMS', default=5000)
+
+# Rows fetched per round trip by the streaming catalogue export
+PRODUCT_EXPORT_CHUNK_SIZE = env.int('PRODUCT_EXPORT_CHUNK_SIZE', default=2000)
+
+# OTP storage, use accounts.otp_store.CacheOTPStore with a shared cache
+# (e.g. Redis) to keep OTPs out of the database
+OTP_STORE = env('OTP_STORE', default='accounts.otp_store.DatabaseOTPStore')
+OTP_STORE_CACHE_ALIAS = 'default'
+
+# Expired UserOTP/PasswordResetId purge, run by `manage.py purge_expired`
+# from cron (see README) or in-process every PURGE_EXPIRED_INTERVAL seconds
+# (0, the default, disables it). Every web worker then runs the loop, and a
+# lock in PURGE_LOCK_CACHE_ALIAS, which must be shared between the workers,
+# lets one of them purge per interval.
+PURGE_CHUNK_SIZE = env.int('PURGE_CHUNK_SIZE', default=1000)
+PURGE_EXPIRED_INTERVAL = env.int('PURGE_EXPIRED_INTERVAL', default=0)
+PURGE_LOCK_CACHE_ALIAS = 'default'
+
+# Token blacklist lookup cache
+TOKEN_BLACKLIST_CACHE_ALIAS = 'default'
+TOKEN_BLACKLIST_LOCAL_MAX_ENTRIES = env.int('TOKEN_BLACKLIST_LOCAL_MAX_ENTRIES', default=10000)
+# Seconds a "not revoked" answer stays in the shared cache (0: not cached)
+TOKEN_BLACKLIST_NEGATIVE_TIMEOUT = env.int('TOKEN_BLACKLIST_NEGATIVE_TIMEOUT', default=5)
+
 # Email Config
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Use django.core.mail.backends.filebased.EmailBackend or
+# django.core.mail.backends.locmem.EmailBackend to deliver offline.
+EMAIL_BACKEND = env('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_FILE_PATH = env('EMAIL_FILE_PATH', default=str(BASE_DIR / 'sent_emails'))
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_HOST_USER = env('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD')
@@ -160,9 +289,21 @@ EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL')
 
+# Outbound email queue, drained by `manage.py run_email_workers`
+EMAIL_QUEUE_BATCH_SIZE = env.int('EMAIL_QUEUE_BATCH_SIZE', default=50)
+EMAIL_QUEUE_MAX_ATTEMPTS = env.int('EMAIL_QUEUE_MAX_ATTEMPTS', default=5)
+EMAIL_QUEUE_RETRY_BACKOFF = env.int('EMAIL_QUEUE_RETRY_BACKOFF', default=30)
+EMAIL_QUEUE_LEASE = env.int('EMAIL_QUEUE_LEASE', default=300)
+
 PROJECT_NAME = 'Auth Microservice'
 
 # Twillio Config
 TWILIO_ACCOUNT_SID = env('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = env('TWILIO_AUTH_TOKEN')
-TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER')
\ No newline at end of file
+TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER')
+
+# SMS gateway, use accounts.sms.LocMemSMSBackend to run without the network
+SMS_BACKEND = env('SMS_BACKEND', default='accounts.sms.TwilioSMSBackend')
+SMS_DISPATCH_WORKERS = env.int('SMS_DISPATCH_WORKERS', default=4)
+SMS_TIMEOUT = env.float('SMS_TIMEOUT', default=10)
+SMS_MAX_RETRIES = env.int('SMS_MAX_RETRIES', default=2)
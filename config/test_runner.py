@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+def has_lagging_replica(alias='replica'):
+    """
+    Whether `alias` has a test database of its own. Tests never write to it,
+    so it acts like a replica that has not caught up with any write yet. A
+    TEST MIRROR shares the primary's test database and can't act like that.
+    """
+    return alias in settings.DATABASES and not settings.DATABASES[alias].get('TEST', {}).get('MIRROR')
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite with read replicas off, so every test reads what it wrote
+    whatever DATABASES holds. Tests of the replica routing turn it on with
+    `override_settings(DATABASE_REPLICAS=[...])`.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.replicas_off = override_settings(DATABASE_REPLICAS=[])
+        self.replicas_off.enable()
+
+    def get_databases(self, suite):
+        # Replica tests name the 'replica' alias and skip when it isn't set up.
+        databases = super().get_databases(suite)
+        return {alias: serialized for alias, serialized in databases.items() if alias in connections}
+
+    def teardown_test_environment(self, **kwargs):
+        self.replicas_off.disable()
+        super().teardown_test_environment(**kwargs)
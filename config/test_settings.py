@@ -0,0 +1,19 @@
+"""
+Settings for running the test suite on SQLite instead of MySQL:
+
+    python manage.py test --settings=config.test_settings
+
+'replica' gets a test database of its own rather than mirroring 'default',
+so it acts like a replica that never catches up and the replica tests run
+(see config.test_runner.has_lagging_replica). They are skipped under
+config.settings, whose replica is a TEST MIRROR of the primary.
+"""
+from config.settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+    'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+}
+DATABASE_REPLICAS = ['replica']
+
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
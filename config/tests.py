@@ -0,0 +1,65 @@
+import time
+
+from django.db import router
+from django.test import SimpleTestCase, override_settings
+
+from accounts.models import ApplicationUser, UserOTP
+from config.backends.pool import ConnectionPool, PoolExhausted
+from config.routers import request_routing
+from products.models import Product
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    class FakeConnection:
+        closed = False
+
+        def close(self):
+            self.closed = True
+
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2, timeout=0)
+        first, reused = pool.acquire(self.FakeConnection)
+        self.assertFalse(reused)
+        pool.release(first)
+
+        self.assertEqual(pool.acquire(self.FakeConnection), (first, True))
+
+    def test_size_is_bounded(self):
+        pool = ConnectionPool(max_size=1, timeout=0.01)
+        connection, _ = pool.acquire(self.FakeConnection)
+        with self.assertRaises(PoolExhausted):
+            pool.acquire(self.FakeConnection)
+
+        # A discarded connection is closed and frees its slot.
+        pool.discard(connection)
+        self.assertTrue(connection.closed)
+        self.assertFalse(pool.acquire(self.FakeConnection)[1])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def test_reads_of_replicated_models_go_to_a_replica_inside_requests(self):
+        self.assertEqual(router.db_for_read(Product), 'default')
+
+        with request_routing():
+            self.assertEqual(router.db_for_read(Product), 'replica')
+            self.assertEqual(router.db_for_read(ApplicationUser), 'replica')
+            self.assertEqual(router.db_for_read(UserOTP), 'default')
+
+    def test_writes_pin_the_request_to_the_primary(self):
+        with request_routing() as state:
+            self.assertEqual(router.db_for_write(ApplicationUser), 'default')
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        # Objects loaded for an update must not come from a lagging replica.
+        with request_routing(primary=True):
+            self.assertEqual(router.db_for_read(ApplicationUser), 'default')
+            self.assertEqual(router.db_for_read(Product), 'default')
+
+    def test_pinned_until(self):
+        with request_routing(pinned_until=time.time() + 5):
+            self.assertEqual(router.db_for_read(Product), 'default')
+        with request_routing(pinned_until=time.time() - 1):
+            self.assertEqual(router.db_for_read(Product), 'replica')
@@ -22,6 +22,7 @@ from rest_framework_simplejwt.views import (
 )
 
 from accounts import web
+from config.instrumentation import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -30,5 +31,6 @@ urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('forgot-password/<password_reset_id>/', web.password_reset_change_password, name="forgot-password"),
+    path('metrics', metrics, name='metrics'),
     path('forgot-password-success/', web.password_reset_success, name="forgot-password-success")
 ]
@@ -0,0 +1,89 @@
+import hashlib
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.http import parse_etags, quote_etag
+
+VERSION_KEY = 'products:catalogue-version'
+BUMPED_AT_KEY = 'products:catalogue-bumped-at'
+
+_bumps_muted = ContextVar('catalogue_bumps_muted', default=False)
+
+
+def get_cache():
+    return caches[settings.PRODUCT_CACHE_ALIAS]
+
+
+def new_version():
+    # Counting restarts from the clock rather than 1, so a version lost with
+    # the cache (eviction, restart, flush) is never handed out again.
+    return time.time_ns()
+
+
+def get_catalogue_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = new_version()
+        cache.add(VERSION_KEY, version, timeout=None)
+        version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def bump_catalogue_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Key missing or evicted: start over from a fresh value, which
+        # invalidates old entries and ETags since they carry the version
+        # they were built from.
+        cache.add(VERSION_KEY, new_version(), timeout=None)
+        cache.incr(VERSION_KEY)
+    cache.set(BUMPED_AT_KEY, time.time(), timeout=None)
+
+
+@contextmanager
+def muted_bumps():
+    """
+    Skip the per-row bumps sent by `products.signals`, for bulk writes that
+    bump the version once themselves after commit.
+    """
+    token = _bumps_muted.set(True)
+    try:
+        yield
+    finally:
+        _bumps_muted.reset(token)
+
+
+def bumps_muted():
+    return _bumps_muted.get()
+
+
+def bumped_within(seconds):
+    bumped_at = get_cache().get(BUMPED_AT_KEY)
+    return bumped_at is not None and time.time() - bumped_at < seconds
+
+
+def make_key(request, action, lookup):
+    params = '&'.join(
+        f'{name}={value}'
+        for name, values in sorted(request.query_params.lists())
+        for value in values
+    )
+    version = get_catalogue_version()
+    digest = hashlib.md5(
+        f'{request.get_host()}|{action}|{lookup}|{params}'.encode()
+    ).hexdigest()
+    return f'products:{version}:{digest}', quote_etag(f'{version}-{digest}')
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose entries live in one process. The catalogue version
+# and ETags in them are bumped only in the process that handled the write,
+# so other workers keep serving their cached responses until they expire.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_product_cache_is_shared(app_configs, **kwargs):
+    alias = settings.PRODUCT_CACHE_ALIAS
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_BACKENDS:
+        return [Warning(
+            f"PRODUCT_CACHE_ALIAS '{alias}' uses {backend}, which is not shared between processes.",
+            hint=(
+                "Product writes only invalidate the cached responses of the process that made "
+                "them. Point PRODUCT_CACHE_ALIAS at a shared cache such as Redis "
+                "(CACHE_URL=redis://...)."
+            ),
+            id='products.W001',
+        )]
+    return []
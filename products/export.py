@@ -0,0 +1,93 @@
+import csv
+import json
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.renderers import BaseRenderer
+
+from products.models import Product
+
+EXPORT_FIELDS = ('id', 'name', 'description', 'price', 'owner_id', 'created_at', 'updated_at')
+ID, UPDATED_AT = EXPORT_FIELDS.index('id'), EXPORT_FIELDS.index('updated_at')
+
+
+class Echo:
+    """File-like object whose `write` returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(since=None, chunk_size=None, using=None):
+    """
+    Yield product rows as tuples of `EXPORT_FIELDS`, ordered by
+    `(updated_at, id)` so an incremental export (`since`) scans
+    `product_updated_id_idx`. Rows are fetched in keyset pages of
+    `chunk_size`, each a bounded query that resumes after the last
+    `(updated_at, id)` seen; drivers such as mysqlclient read a whole
+    `.iterator()` result into memory.
+    """
+    chunk_size = chunk_size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+    queryset = Product.objects.using(using).order_by('updated_at', 'id').values_list(*EXPORT_FIELDS)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since)
+    page = queryset
+    while True:
+        rows = list(page[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last_id, last_updated_at = rows[-1][ID], rows[-1][UPDATED_AT]
+        page = queryset.filter(
+            Q(updated_at__gt=last_updated_at) | Q(updated_at=last_updated_at, id__gt=last_id)
+        )
+
+
+def iter_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def aiter_lines(lines, size=None):
+    """
+    Async iterator over the sync `lines` for StreamingHttpResponse under
+    ASGI, which reads a sync iterator whole before sending any of it. The
+    queries run in a worker thread, `size` lines (one keyset page by
+    default) per hop, and each batch is sent as one chunk.
+    """
+    size = size or settings.PRODUCT_EXPORT_CHUNK_SIZE
+    next_batch = sync_to_async(lambda: ''.join(islice(lines, size)))
+    while batch := await next_batch():
+        yield batch
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Only used to negotiate `?format=ndjson`; exports are streamed by the
+    view. Error responses render as a single JSON line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+    stream = staticmethod(iter_ndjson)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder) + '\n'
+
+
+class CSVRenderer(NDJSONRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    stream = staticmethod(iter_csv)
@@ -0,0 +1,54 @@
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from products.search import search_products
+
+
+class ProductFilterSerializer(serializers.Serializer):
+    price_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    price_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    owner = serializers.IntegerField(required=False, min_value=1)
+    created_after = serializers.DateTimeField(required=False)
+    created_before = serializers.DateTimeField(required=False)
+    updated_after = serializers.DateTimeField(required=False)
+    updated_before = serializers.DateTimeField(required=False)
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Price range, owner and created/updated window filters. Both ends of
+    each range are inclusive.
+    """
+    lookups = {
+        'price_min': 'price__gte',
+        'price_max': 'price__lte',
+        'owner': 'owner_id',
+        'created_after': 'created_at__gte',
+        'created_before': 'created_at__lte',
+        'updated_after': 'updated_at__gte',
+        'updated_before': 'updated_at__lte',
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = {
+            name: value for name, value in request.query_params.items()
+            if name in self.lookups
+        }
+        if not params:
+            return queryset
+
+        serializer = ProductFilterSerializer(data=params)
+        serializer.is_valid(raise_exception=True)
+        return queryset.filter(**{
+            self.lookups[name]: value for name, value in serializer.validated_data.items()
+        })
+
+
+class ProductSearchFilter(BaseFilterBackend):
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        return search_products(queryset, text)
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from rest_framework import serializers
+
+from config.importer import BaseImporter
+from products.cache import bump_catalogue_version
+from products.models import Product
+from products.serializers import ProductSerializer
+
+
+class ProductImporter(BaseImporter):
+    """
+    Imports products owned by the user in each record's `owner_id`, the
+    column written by the catalogue export.
+    """
+    model = Product
+    serializer_class = ProductSerializer
+
+    def validate_record(self, record):
+        attrs = super().validate_record(record)
+        try:
+            attrs['owner_id'] = int(record['owner_id'])
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError({'owner_id': ['A valid integer is required.']})
+        return attrs
+
+    def validate_chunk(self, records, validated, errors):
+        owner_ids = {attrs['owner_id'] for attrs in validated.values()}
+        existing = set(
+            get_user_model().objects.filter(pk__in=owner_ids).values_list('pk', flat=True)
+        )
+        for index, attrs in list(validated.items()):
+            if attrs['owner_id'] not in existing:
+                errors[index] = {'owner_id': ['Not found.']}
+                del validated[index]
+
+    def write(self, objects):
+        super().write(objects)
+        # bulk_create sends no post_save, which normally bumps the version.
+        if objects:
+            transaction.on_commit(bump_catalogue_version)
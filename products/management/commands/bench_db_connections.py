@@ -0,0 +1,97 @@
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connection, connections
+from django.test import Client
+
+from config.backends.pool import POOLED_ENGINES, get_pool
+from config.instrumentation import db_connections_opened, db_connections_reused
+from config.loadtest import LoadTest, ScenarioStats
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive GET /products/ from concurrent in-process clients with "
+        "per-request connections (CONN_MAX_AGE=0), persistent connections "
+        "and the pooled backend, and report how many database connections "
+        "each opened."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--pool-size', type=int, default=4)
+        parser.add_argument('--products', type=int, default=200)
+        parser.add_argument('--host', default='localhost', help="Host header, must be in ALLOWED_HOSTS.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("An in-memory SQLite database is not shared between threads.")
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        engine = settings_dict['ENGINE']
+        engine = next((stock for stock, pooled in POOLED_ENGINES.items() if pooled == engine), engine)
+        if engine not in POOLED_ENGINES:
+            raise CommandError(f"No pooled backend for {engine}.")
+
+        configurations = {
+            'per-request': {'ENGINE': engine, 'CONN_MAX_AGE': 0},
+            'persistent': {'ENGINE': engine, 'CONN_MAX_AGE': 60},
+            'pooled': {'ENGINE': POOLED_ENGINES[engine], 'CONN_MAX_AGE': 0, 'POOL_SIZE': options['pool_size']},
+        }
+        self.host = options['host']
+        loadtest = LoadTest(users=10, products=options['products'], requests=options['requests'], concurrency=1)
+        loadtest.seed()
+        self.run_id = loadtest.run_id
+        self.counter = itertools.count()
+        self.token = loadtest.tokens[loadtest.users[0].pk][1]
+        original = dict(settings_dict)
+        try:
+            for label, overrides in configurations.items():
+                settings_dict.update(overrides)
+                self.write_result(label, *self.measure(options['requests'], options['concurrency']))
+                if label == 'pooled':
+                    get_pool(settings_dict, DEFAULT_DB_ALIAS).close_idle()
+        finally:
+            settings_dict.clear()
+            settings_dict.update(original)
+            loadtest.cleanup()
+
+    def measure(self, requests, concurrency):
+        opened = db_connections_opened.value(alias=DEFAULT_DB_ALIAS)
+        reused = db_connections_reused.value(alias=DEFAULT_DB_ALIAS)
+        stats = ScenarioStats()
+
+        def worker(count):
+            # New threads, so every configuration starts with fresh connection
+            # wrappers built from the updated settings.
+            client = Client(HTTP_HOST=self.host, HTTP_AUTHORIZATION=f'Bearer {self.token}')
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    # A distinct query string per request bypasses the response cache.
+                    response = client.get('/products/', {'bench': f'{self.run_id}-{next(self.counter)}'})
+                    # The test client skips this request_finished handler.
+                    close_old_connections()
+                    stats.record(time.perf_counter() - started, 0, response.status_code)
+            finally:
+                connections.close_all()
+
+        shares = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, shares))
+        return (
+            stats.summary(time.perf_counter() - started),
+            db_connections_opened.value(alias=DEFAULT_DB_ALIAS) - opened,
+            db_connections_reused.value(alias=DEFAULT_DB_ALIAS) - reused,
+        )
+
+    def write_result(self, label, result, opened, reused):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{label:>11}: {result["requests"]} requests, {opened} connections opened, '
+            f'{reused} pool checkouts, {result["throughput_rps"]:8.1f} req/s, '
+            f'p50 {latency["p50"]:6.2f} ms, p99 {latency["p99"]:6.2f} ms, {result["errors"]} error(s)'
+        )
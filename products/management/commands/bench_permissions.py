@@ -0,0 +1,82 @@
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework import permissions
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.authentication import StatelessJWTAuthentication
+from accounts.tokens import AccountRefreshToken
+from products.permissions import IsAdmin, IsManagerOrAdmin, IsOwner, IsReadOnly
+from products.views import ProductViewSet
+
+
+class PerRequestProductViewSet(ProductViewSet):
+    """The previous get_permissions: a new list of instances per request."""
+
+    def get_permissions(self):
+        if self.action == 'list':
+            permission_classes = [IsReadOnly]
+        elif self.action in ['create', 'bulk_create']:
+            permission_classes = [IsManagerOrAdmin]
+        elif self.action in ['bulk_update', 'bulk_destroy']:
+            permission_classes = [permissions.IsAuthenticated]
+        elif self.action in ['partial_update', 'destroy']:
+            permission_classes = [IsOwner | IsAdmin]
+        else:
+            permission_classes = [permissions.IsAdminUser]
+        return [permission() for permission in permission_classes]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ProductViewSet.check_permissions with per-request permission "
+        "instances and with the compiled policy table, for a user "
+        "authenticated from token claims."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username='bench-permissions', email='bench-permissions@example.com', role='manager',
+            )
+            access = AccountRefreshToken.for_user(user).access_token
+            claims_user = StatelessJWTAuthentication().get_user(access)
+            transaction.set_rollback(True)
+
+        factory = APIRequestFactory()
+        for action, method in (('list', 'get'), ('create', 'post'), ('partial_update', 'patch')):
+            request = Request(getattr(factory, method)('/products/'))
+            request.user = claims_user
+            for label, viewset in (('per-request', PerRequestProductViewSet), ('compiled', ProductViewSet)):
+                view = viewset(action=action, request=request, format_kwarg=None, args=(), kwargs={})
+                seconds, allocated = self.measure(view, request, options['iterations'])
+                self.stdout.write(
+                    f'{action:>14} {label:>11}: {seconds / options["iterations"] * 1e9:7.0f} ns/check, '
+                    f'{allocated} bytes allocated per check'
+                )
+
+    def measure(self, view, request, iterations):
+        check = view.check_permissions
+        check(request)
+
+        started = time.perf_counter()
+        for _ in range(iterations):
+            check(request)
+        seconds = time.perf_counter() - started
+
+        # Peak memory allocated during one check beyond what was live before.
+        tracemalloc.start()
+        check(request)
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        check(request)
+        allocated = tracemalloc.get_traced_memory()[1] - current
+        tracemalloc.stop()
+        return seconds, allocated
@@ -0,0 +1,86 @@
+import time
+from urllib.parse import parse_qs, urlparse
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.test import APIRequestFactory
+
+from products.models import Product
+from products.pagination import ProductCursorPagination
+from products.views import ProductViewSet
+
+
+class PageNumberProductViewSet(ProductViewSet):
+    queryset = Product.objects.order_by('-created_at', '-id')
+    pagination_class = PageNumberPagination
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare page-number and cursor pagination latency at increasing depth "
+        "of the product list. Seeds products inside a rolled back transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=2000000)
+        parser.add_argument('--batch-size', type=int, default=10000)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['products'], options['batch_size'])
+            self.run(options['products'], options['page_size'])
+            transaction.set_rollback(True)
+
+    def seed(self, count, batch_size):
+        owner = get_user_model().objects.create_user(username='bench-products')
+        started = time.perf_counter()
+        for start in range(0, count, batch_size):
+            Product.objects.bulk_create(
+                Product(
+                    name=f'Product {i}',
+                    description='Benchmark product',
+                    price=Decimal('9.99'),
+                    owner=owner,
+                )
+                for i in range(start, min(start + batch_size, count))
+            )
+        self.stdout.write(f'Seeded {count} products in {time.perf_counter() - started:.1f}s')
+
+    def timed(self, view, request, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = view(request)
+            response.render()
+            if response.status_code != 200:
+                raise CommandError(f'{response.status_code}: {response.data}')
+            timings.append((time.perf_counter() - started) * 1000)
+        return sorted(timings)[repeat // 2]
+
+    def run(self, count, page_size):
+        factory = APIRequestFactory(HTTP_HOST='localhost')
+        page_view = PageNumberProductViewSet.as_view({'get': 'list'})
+        cursor_view = ProductViewSet.as_view({'get': 'list'})
+        paginator = ProductCursorPagination()
+        ordered = Product.objects.order_by('-created_at', '-id')
+
+        depth = 1
+        while depth * page_size <= count:
+            page_ms = self.timed(page_view, factory.get('/products/', {'page': depth}))
+
+            # Cursor pointing at the same depth: the last row of the previous page.
+            query = {'page_size': page_size}
+            if depth > 1:
+                anchor = ordered[(depth - 1) * page_size - 1]
+                paginator.base_url = 'http://localhost/products/'
+                cursor_url = paginator.encode_cursor(anchor, reverse=False)
+                query['cursor'] = parse_qs(urlparse(cursor_url).query)['cursor'][0]
+            cursor_ms = self.timed(cursor_view, factory.get('/products/', query))
+            self.stdout.write(
+                f'page {depth:>8}: page-number {page_ms:8.2f} ms, cursor {cursor_ms:8.2f} ms'
+            )
+            depth *= 10
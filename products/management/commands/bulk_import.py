@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.importers import UserImporter
+from config.importer import Checkpoint, read_records, run_import
+from products.importers import ProductImporter
+
+IMPORTERS = {'users': UserImporter, 'products': ProductImporter}
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users or products from a CSV or NDJSON file into the database "
+        "in bulk_create chunks. Progress is checkpointed after every chunk; "
+        "rerun with --resume to continue an interrupted import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=IMPORTERS)
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=('csv', 'ndjson'), default=None)
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--batch-size', type=int, default=None, help="Rows per INSERT.")
+        parser.add_argument('--hash-workers', type=int, default=None, help="Password hashing processes (users).")
+        parser.add_argument('--checkpoint', help="Checkpoint file, defaults to <path>.checkpoint.")
+        parser.add_argument('--resume', action='store_true', help="Continue from the checkpoint.")
+
+    def handle(self, *args, **options):
+        try:
+            records = read_records(options['path'], options['format'])
+        except OSError as e:
+            raise CommandError(e)
+
+        checkpoint = Checkpoint(options['checkpoint'] or f"{options['path']}.checkpoint")
+        if not options['resume']:
+            checkpoint.clear()
+
+        kwargs = {'batch_size': options['batch_size']}
+        if options['model'] == 'users':
+            kwargs['hash_workers'] = options['hash_workers']
+        importer = IMPORTERS[options['model']](**kwargs)
+
+        imported = failed = processed = 0
+        seconds = 0.0
+        for result in run_import(importer, records, options['chunk_size'], checkpoint):
+            for number, detail in result.errors.items():
+                self.stderr.write(f'record {number}: {detail}')
+            processed += result.imported + len(result.errors)
+            imported += result.imported
+            failed += len(result.errors)
+            seconds += result.seconds
+            self.stdout.write(
+                f'{result.position} records read, {imported} imported, {failed} rejected, '
+                f'{processed / seconds if seconds else 0:.0f} records/s'
+            )
+
+        checkpoint.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} {options["model"]}, rejected {failed}.'
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from products.export import export_rows, iter_csv, iter_ndjson
+
+FORMATS = {'ndjson': iter_ndjson, 'csv': iter_csv}
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream the product catalogue as NDJSON or CSV to a file or stdout. "
+        "Memory use does not grow with the number of products."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument('--since', help="Only products updated after this ISO 8601 datetime.")
+        parser.add_argument('--output', '-o', help="Output file, defaults to stdout.")
+        parser.add_argument('--chunk-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError(f"Invalid --since datetime: {options['since']}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        rows = export_rows(since=since, chunk_size=options['chunk_size'])
+        lines = FORMATS[options['format']](rows)
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(lines)
+        else:
+            for line in lines:
+                self.stdout.write(line, ending='')
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from config.loadtest import LoadTest, write_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed users and products, drive the auth and product endpoints with "
+        "concurrent in-process clients and report latency percentiles, "
+        "throughput and queries per request as JSON. Seeded and registered "
+        "accounts are deleted afterwards unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--products', type=int, default=10000)
+        parser.add_argument('--requests', type=int, default=200, help="Requests per scenario.")
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--scenario', action='append', dest='scenarios', help="Repeatable, defaults to all.")
+        parser.add_argument('--host', default='localhost', help="Host header, must be in ALLOWED_HOSTS.")
+        parser.add_argument('--output', '-o', default='loadtest.json')
+        parser.add_argument('--keep', action='store_true', help="Keep the seeded data.")
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("An in-memory SQLite database is not shared between threads.")
+
+        loadtest = LoadTest(
+            users=options['users'],
+            products=options['products'],
+            requests=options['requests'],
+            concurrency=options['concurrency'],
+            host=options['host'],
+        )
+        unknown = set(options['scenarios'] or ()) - set(loadtest.scenarios)
+        if unknown:
+            raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+
+        self.stdout.write(f'Seeding {options["users"]} users and {options["products"]} products ({loadtest.run_id})')
+        loadtest.seed()
+        try:
+            results = loadtest.run(options['scenarios'], on_result=self.write_result)
+        finally:
+            if not options['keep']:
+                loadtest.cleanup()
+
+        write_report(loadtest.report(results), options['output'])
+        self.stdout.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+
+    def write_result(self, scenario, result):
+        latency = result['latency_ms']
+        self.stdout.write(
+            f'{scenario:>15}: {result["throughput_rps"]:8.1f} req/s, '
+            f'p50 {latency["p50"]:8.2f} ms, p95 {latency["p95"]:8.2f} ms, p99 {latency["p99"]:8.2f} ms, '
+            f'{result["queries_per_request"]["mean"]:5.1f} queries/req, {result["errors"]} error(s)'
+        )
@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 14:10
+
+from django.db import migrations, models
+
+
+def create_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute(
+        'CREATE FULLTEXT INDEX product_name_description_ft '
+        'ON products_product (name, description)'
+    )
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'mysql':
+        return
+    schema_editor.execute('DROP INDEX product_name_description_ft ON products_product')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_product_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at', 'id'], name='product_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+        ),
+        # FULLTEXT backs ?search= on MySQL; other backends use the
+        # in-process index in products.search.
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
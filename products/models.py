@@ -10,5 +10,13 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='product_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='product_updated_id_idx'),
+            models.Index(fields=['price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+        ]
+
     def __str__(self):
         return self.name
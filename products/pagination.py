@@ -0,0 +1,144 @@
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ProductCursorPagination(BasePagination):
+    """
+    Keyset pagination over `(<ordering field>, id)`, newest first by
+    default. Each page is a range scan on the matching `(field, id)` index
+    that starts where the previous page ended, so latency does not grow
+    with depth. The ordering field is the first term of the queryset's
+    ordering (see `OrderingFilter`); later terms are replaced by `id`.
+    The total count is only computed when the client asks for it with
+    `?count=true`.
+    """
+    cursor_query_param = 'cursor'
+    ordering = '-created_at'
+    keyset_fields = ('created_at', 'updated_at', 'price', 'name')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    count_query_param = 'count'
+    invalid_cursor_message = _('Invalid cursor')
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        order_by = queryset.query.order_by
+        if order_by and order_by[0].lstrip('-') in self.keyset_fields:
+            return order_by[0]
+        return self.ordering
+
+    def encode_cursor(self, obj, reverse):
+        field_name = self.ordering.lstrip('-')
+        value = getattr(obj, field_name)
+        value = value.isoformat() if hasattr(value, 'isoformat') else f'{value}'
+        token = f'{field_name}|{value}|{obj.pk}|{int(reverse)}'
+        encoded = b64encode(token.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            token = b64decode(encoded.encode('ascii')).decode('utf-8')
+            field_name, token = token.split('|', 1)
+            value, pk, reverse = token.rsplit('|', 2)
+            if field_name != self.ordering.lstrip('-'):
+                raise ValueError
+            value = model._meta.get_field(field_name).to_python(value)
+            return value, int(pk), bool(int(reverse))
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+
+        field_name = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor[2])
+
+        # Walking backwards flips the scan direction.
+        forward_descending = descending != reverse
+        prefix = '-' if forward_descending else ''
+        queryset = queryset.order_by(f'{prefix}{field_name}', f'{prefix}id')
+        if cursor is not None:
+            value, pk = cursor[:2]
+            strict, bound, tie = ('lt', 'lte', 'id__lt') if forward_descending else ('gt', 'gte', 'id__gt')
+            # The inclusive bound drives the index range, the OR only breaks ties.
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{strict}': value}) | Q(**{tie: pk}),
+                **{f'{field_name}__{bound}': value},
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
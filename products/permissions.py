@@ -1,5 +1,15 @@
+from django.db.models import Q
 from rest_framework import permissions
 
+# Role checks read `request.user.role`, which StatelessJWTAuthentication
+# serves from the access token's `role` claim.
+ADMIN_ROLES = frozenset(['admin'])
+MANAGER_OR_ADMIN_ROLES = frozenset(['admin', 'manager'])
+
+
+def has_role(user, roles):
+    return getattr(user, 'role', None) in roles
+
 
 class IsReadOnly(permissions.BasePermission):
     def has_permission(self, request, view):
@@ -11,18 +21,23 @@ class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return request.user.role == 'admin' or request.user.is_staff
+        return has_role(request.user, ADMIN_ROLES) or request.user.is_staff
 
 
 class IsManagerOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return request.user.role in ['admin', 'manager']
+        return has_role(request.user, MANAGER_OR_ADMIN_ROLES)
 
 
 class IsOwner(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.owner == request.user
+        return obj.owner_id == request.user.pk
+
+    def scope(self, request, view):
+        if request.method in permissions.SAFE_METHODS:
+            return None
+        return Q(owner_id=request.user.pk)
@@ -0,0 +1,86 @@
+import re
+import threading
+
+from django.db import connection
+from django.db.models import BooleanField, Func
+
+from products.cache import get_catalogue_version
+from products.models import Product
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class MatchAgainst(Func):
+    """
+    MySQL `MATCH (name, description) AGAINST (... IN BOOLEAN MODE)`, served
+    by the `product_name_description_ft` FULLTEXT index.
+    """
+    template = 'MATCH (%(expressions)s) AGAINST (%%s IN BOOLEAN MODE)'
+    output_field = BooleanField()
+
+    def __init__(self, *expressions, query):
+        super().__init__(*expressions)
+        self.query = query
+
+    def as_sql(self, compiler, connection, **extra_context):
+        sql, params = super().as_sql(compiler, connection, **extra_context)
+        return sql, (*params, self.query)
+
+
+class InvertedIndex:
+    """
+    In-process token -> product id index used where FULLTEXT is not
+    available (SQLite in tests and local runs). Rebuilt whenever the
+    catalogue version changes.
+    """
+
+    def __init__(self):
+        self.version = None
+        self.postings = {}
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        version = get_catalogue_version()
+        if version == self.version:
+            return
+        with self._lock:
+            if version == self.version:
+                return
+            postings = {}
+            rows = Product.objects.values_list('id', 'name', 'description').iterator(chunk_size=2000)
+            for pk, name, description in rows:
+                for token in set(tokenize(f'{name} {description}')):
+                    postings.setdefault(token, set()).add(pk)
+            self.postings, self.version = postings, version
+
+    def search(self, terms):
+        self.refresh()
+        postings = self.postings
+        matches = None
+        for term in terms:
+            # Prefix match, like `term*` in MySQL boolean mode.
+            ids = set()
+            for token, token_ids in postings.items():
+                if token.startswith(term):
+                    ids |= token_ids
+            matches = ids if matches is None else matches & ids
+            if not matches:
+                return set()
+        return matches or set()
+
+
+inverted_index = InvertedIndex()
+
+
+def search_products(queryset, text):
+    terms = tokenize(text)
+    if not terms:
+        return queryset
+    if connection.vendor == 'mysql':
+        query = ' '.join(f'+{term}*' for term in terms)
+        return queryset.filter(MatchAgainst('name', 'description', query=query))
+    return queryset.filter(pk__in=inverted_index.search(terms))
@@ -1,11 +1,132 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, router
+from django.utils import timezone
 from rest_framework import serializers
 
+from config.instrumentation import TimedSerializerMixin
 from products.models import Product
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductOwnerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = get_user_model()
+        fields = ('id', 'username', 'first_name', 'last_name')
+        read_only_fields = fields
+
+
+def inserted_ids(connection, count):
+    """
+    Ids of the `count` rows of the last multi-row INSERT on `connection`,
+    for MySQL and SQLite. Such an INSERT gets consecutive auto-increment
+    values: MySQL reports the first one (and steps by
+    `auto_increment_increment`), SQLite the last one.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('SELECT LAST_INSERT_ID(), @@session.auto_increment_increment')
+            first, step = cursor.fetchone()
+        else:
+            cursor.execute('SELECT last_insert_rowid()')
+            first, step = cursor.fetchone()[0] - count + 1, 1
+    return range(first, first + count * step, step)
+
+
+class ProductListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    """
+    Saves a list of products with `bulk_create`/`bulk_update`, in batches of
+    `PRODUCT_BULK_BATCH_SIZE` rows. Callers wrap `save()` in a transaction.
+
+    For updates `instance` is a `{pk: product}` mapping and every item must
+    carry the `id` of one of those products. Neither path sends model
+    signals. On backends whose bulk insert returns no ids (MySQL) they are
+    read back after each batch, see `inserted_ids`; on other such backends
+    products are saved one by one.
+    """
+
+    def run_child_validation(self, data):
+        if self.instance is None:
+            return super().run_child_validation(data)
+
+        try:
+            pk = int(data['id'])
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError({'id': ['A valid integer is required.']})
+        instance = self.instance.get(pk)
+        if instance is None:
+            raise serializers.ValidationError({'id': ['Not found.']})
+
+        self.child.instance = instance
+        self.child.initial_data = data
+        return {**super().run_child_validation(data), 'id': pk}
+
+    def create(self, validated_data):
+        ModelClass = self.child.Meta.model
+        objects = [ModelClass(**attrs) for attrs in validated_data]
+        connection = connections[router.db_for_write(ModelClass)]
+        batch_size = settings.PRODUCT_BULK_BATCH_SIZE
+        if connection.features.can_return_rows_from_bulk_insert:
+            return ModelClass.objects.bulk_create(objects, batch_size=batch_size)
+        if connection.vendor not in ('mysql', 'sqlite'):
+            # The rows have no other unique key to fetch their ids back by.
+            for obj in objects:
+                obj.save(force_insert=True)
+            return objects
+
+        for start in range(0, len(objects), batch_size):
+            batch = objects[start:start + batch_size]
+            # One INSERT per batch, so its rows get consecutive ids.
+            ModelClass.objects.using(connection.alias).bulk_create(batch, batch_size=len(batch))
+            for obj, pk in zip(batch, inserted_ids(connection, len(batch))):
+                obj.pk = pk
+        return objects
+
+    def update(self, instances, validated_data):
+        # bulk_update skips Field.pre_save, so auto_now is applied by hand.
+        now = timezone.now()
+        updated = []
+        fields = {'updated_at'}
+        for attrs in validated_data:
+            instance = instances[attrs.pop('id')]
+            for attr, value in attrs.items():
+                setattr(instance, attr, value)
+            instance.updated_at = now
+            fields.update(attrs)
+            updated.append(instance)
+
+        self.child.Meta.model.objects.bulk_update(
+            updated, sorted(fields), batch_size=settings.PRODUCT_BULK_BATCH_SIZE,
+        )
+        return updated
+
+
+class ProductSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Honours `fields` (sparse fieldset) and `expand` from the serializer
+    context, set by `ProductViewSet` from `?fields=` and `?expand=`.
+    """
+
     class Meta:
         model = Product
         fields = '__all__'
         read_only_fields = ('owner', 'id')
+        list_serializer_class = ProductListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if 'owner' in self.context.get('expand', ()):
+            self.fields['owner'] = ProductOwnerSerializer(read_only=True)
+
+        sparse_fields = self.context.get('fields')
+        if sparse_fields:
+            for field_name in set(self.fields) - set(sparse_fields):
+                self.fields.pop(field_name)
+
 
+class ProductBulkDeleteSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.PRODUCT_BULK_MAX_ITEMS,
+    )
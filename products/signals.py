@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.cache import bump_catalogue_version, bumps_muted
+from products.models import Product
+from products.serializers import ProductOwnerSerializer
+
+# Owner fields are rendered by `?expand=owner`, so renaming a user also
+# invalidates cached catalogue responses. Saves that leave them alone don't.
+OWNER_FIELDS = set(ProductOwnerSerializer.Meta.fields)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    if not bumps_muted():
+        bump_catalogue_version()
+
+
+@receiver(post_save, sender=get_user_model())
+def owner_changed(sender, instance, created, update_fields=None, **kwargs):
+    if not created and instance.changed_fields(OWNER_FIELDS, update_fields):
+        bump_catalogue_version()
@@ -1,3 +1,541 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+from base64 import b64encode
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from accounts.importers import UserImporter
+from accounts.models import ApplicationUser
+from accounts.tokens import AccountRefreshToken
+from config.importer import Checkpoint, run_import
+from config.test_runner import has_lagging_replica
+from products.cache import get_cache
+from products.checks import check_product_cache_is_shared
+from products.export import export_rows
+from products.importers import ProductImporter
+from products.models import Product
+from products.pagination import ProductCursorPagination
+
+
+class ProductListQueryTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def create_products(self, count):
+        for i in range(count):
+            username = f'owner-{Product.objects.count()}'
+            owner = ApplicationUser.objects.create_user(
+                username=username, email=f'{username}@example.com'
+            )
+            Product.objects.create(
+                name=f'Product {i}', description='Description', price=Decimal('1.00'), owner=owner,
+            )
+
+    def test_expanded_owner_is_constant_queries_per_page(self):
+        self.create_products(3)
+        with self.assertNumQueries(1):
+            response = self.client.get('/products/', {'expand': 'owner'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['owner']['username'], 'owner-2')
+
+        self.create_products(7)
+        with self.assertNumQueries(1):
+            response = self.client.get('/products/', {'expand': 'owner'})
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_sparse_fieldset_shrinks_select(self):
+        self.create_products(2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/products/', {'fields': 'id,name,price'})
+
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'price'})
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"owner_id"', sql)
+
+    def test_retrieve_with_expanded_owner_is_one_query(self):
+        self.create_products(1)
+        product = Product.objects.get()
+        user = ApplicationUser.objects.create_user(
+            username='staff', email='staff@example.com', is_staff=True
+        )
+        self.client.force_authenticate(user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/products/{product.pk}/', {'expand': 'owner'})
+        self.assertEqual(response.data['owner']['id'], product.owner_id)
+
+
+class ProductResponseCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.owner = ApplicationUser.objects.create_user(
+            username='owner', email='owner@example.com', role='manager'
+        )
+        Product.objects.create(
+            name='Product', description='Description', price=Decimal('1.00'), owner=self.owner,
+        )
+
+    def test_unchanged_catalogue_is_served_without_queries(self):
+        response = self.client.get('/products/')
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/products/')
+        self.assertEqual(cached.data, response.data)
+
+        with self.assertNumQueries(0):
+            not_modified = self.client.get('/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_product_write_invalidates_cache(self):
+        etag = self.client.get('/products/')['ETag']
+        Product.objects.create(
+            name='New', description='Description', price=Decimal('2.00'), owner=self.owner,
+        )
+
+        response = self.client.get('/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_only_owner_changes_invalidate_cache(self):
+        owner = ApplicationUser.objects.get(pk=self.owner.pk)
+        with mock.patch('products.signals.bump_catalogue_version') as bump:
+            owner.is_email_verified = True
+            owner.save()
+            owner.first_name = 'Renamed'
+            owner.save(update_fields=['is_email_verified'])
+            bump.assert_not_called()
+
+            owner.save()
+            bump.assert_called_once_with()
+            owner.save()
+            bump.assert_called_once_with()
+
+    def test_lost_version_does_not_revive_old_etags(self):
+        etag = self.client.get('/products/')['ETag']
+        Product.objects.create(
+            name='New', description='Description', price=Decimal('2.00'), owner=self.owner,
+        )
+        # The cache restarts after the write, e.g. evicted or flushed.
+        get_cache().clear()
+
+        response = self.client.get('/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class ProductFilterTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.owner = ApplicationUser.objects.create_user(username='owner', email='owner@example.com')
+        self.other = ApplicationUser.objects.create_user(username='other', email='other@example.com')
+        for i in range(6):
+            Product.objects.create(
+                name=f'Red widget {i}' if i % 2 else f'Blue gadget {i}',
+                description='Description', price=Decimal(i),
+                owner=self.owner if i < 4 else self.other,
+            )
+
+    def names(self, params):
+        response = self.client.get('/products/', params)
+        self.assertEqual(response.status_code, 200)
+        return [product['name'] for product in response.data['results']]
+
+    def test_price_range_and_owner(self):
+        self.assertEqual(self.names({'price_min': '2', 'price_max': '4'}), [
+            'Blue gadget 4', 'Red widget 3', 'Blue gadget 2',
+        ])
+        self.assertEqual(self.names({'owner': self.other.pk}), ['Red widget 5', 'Blue gadget 4'])
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get('/products/', {'price_min': 'cheap'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('price_min', response.data)
+
+    def test_search_matches_all_terms_by_prefix(self):
+        self.assertEqual(self.names({'search': 'wid RED'}), ['Red widget 5', 'Red widget 3', 'Red widget 1'])
+
+    def test_ordering_walks_every_page(self):
+        seen = []
+        url = '/products/?ordering=-price&page_size=4'
+        while url:
+            response = self.client.get(url)
+            seen += [product['price'] for product in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, ['5.00', '4.00', '3.00', '2.00', '1.00', '0.00'])
+
+
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        owner = ApplicationUser.objects.create_user(username='owner', email='owner@example.com')
+        # Prices tie in pairs, so pages must break ties on id.
+        self.products = [
+            Product.objects.create(name=f'Product {i}', description='Description', price=Decimal(i // 2), owner=owner)
+            for i in range(7)
+        ]
+
+    def cursor(self, token):
+        return b64encode(token.encode()).decode()
+
+    def test_tampered_cursors_are_rejected(self):
+        for cursor in (
+            'not base64!',
+            self.cursor('garbage'),
+            self.cursor('price|1.00|1|0'),  # field other than the ordering's
+            self.cursor('created_at|yesterday|1|0'),
+            self.cursor('created_at|2024-01-01T00:00:00+00:00|one|0'),
+        ):
+            response = self.client.get('/products/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.data, {'detail': 'Invalid cursor'})
+
+    def test_page_size_is_clamped(self):
+        pagination = ProductCursorPagination()
+        for value, expected in (('3', 3), ('1000', 100), ('0', 10), ('-5', 10), ('many', 10), (None, 10)):
+            params = {} if value is None else {'page_size': value}
+            request = Request(APIRequestFactory().get('/products/', params))
+            self.assertEqual(pagination.get_page_size(request), expected, value)
+
+    def test_ties_on_the_ordering_key_are_walked_both_ways(self):
+        expected = [product.pk for product in sorted(self.products, key=lambda product: (product.price, product.pk))]
+        forward, url = [], '/products/?ordering=price&page_size=2'
+        while url:
+            response = self.client.get(url)
+            forward += [product['id'] for product in response.data['results']]
+            last = response
+            url = response.data['next']
+        self.assertEqual(forward, expected)
+
+        backward, url = [], last.data['previous']
+        while url:
+            response = self.client.get(url)
+            backward = [product['id'] for product in response.data['results']] + backward
+            url = response.data['previous']
+        self.assertEqual(backward, expected[:-1])
+
+
+class ProductBulkTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.manager = ApplicationUser.objects.create_user(
+            username='manager', email='manager@example.com', role='manager'
+        )
+        self.other = ApplicationUser.objects.create_user(
+            username='other', email='other@example.com', role='manager'
+        )
+        self.client.force_authenticate(self.manager)
+
+    def test_bulk_create_reports_errors_by_position(self):
+        response = self.client.post('/products/bulk/', [
+            {'name': 'Valid', 'description': 'Description', 'price': '1.00'},
+            {'name': 'Invalid', 'description': 'Description', 'price': 'free'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('price', response.data[1])
+        self.assertFalse(Product.objects.exists())
+
+        response = self.client.post('/products/bulk/', [
+            {'name': f'Product {i}', 'description': 'Description', 'price': '1.00'} for i in range(3)
+        ], format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Product.objects.filter(owner=self.manager).count(), 3)
+        self.assertEqual(
+            sorted(product['id'] for product in response.data),
+            sorted(Product.objects.values_list('id', flat=True)),
+        )
+
+    def test_bulk_create_returns_ids_where_bulk_insert_cannot(self):
+        # As on MySQL, whose bulk INSERT returns no ids.
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False), \
+                self.settings(PRODUCT_BULK_BATCH_SIZE=2), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/products/bulk/', [
+                {'name': f'Product {i}', 'description': 'Description', 'price': '1.00'} for i in range(3)
+            ], format='json')
+        self.assertEqual(response.status_code, 201)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(
+            [product['id'] for product in response.data],
+            list(Product.objects.order_by('name').values_list('id', flat=True)),
+        )
+
+    def test_bulk_update_and_delete_only_touch_owned_products(self):
+        own = Product.objects.create(name='Own', description='Description', price=Decimal('1.00'), owner=self.manager)
+        theirs = Product.objects.create(name='Theirs', description='Description', price=Decimal('1.00'), owner=self.other)
+
+        response = self.client.patch('/products/bulk/', [
+            {'id': own.pk, 'price': '2.00'}, {'id': theirs.pk, 'price': '2.00'},
+        ], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data[1])
+
+        response = self.client.patch('/products/bulk/', [{'id': own.pk, 'price': '2.00'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        own.refresh_from_db()
+        self.assertEqual(own.price, Decimal('2.00'))
+
+        # The collector's SELECT and one DELETE, in a savepoint, and a single
+        # bump after commit instead of one per row.
+        with self.assertNumQueries(4), \
+                mock.patch('products.signals.bump_catalogue_version') as row_bump, \
+                mock.patch('products.views.bump_catalogue_version') as bump:
+            response = self.client.delete('/products/bulk/', {'ids': [own.pk, theirs.pk]}, format='json')
+        self.assertEqual(response.data, {'deleted': 1})
+        row_bump.assert_not_called()
+        bump.assert_called_once_with()
+        self.assertEqual(list(Product.objects.all()), [theirs])
+
+
+class ProductExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = ApplicationUser.objects.create_user(
+            username='admin', email='admin@example.com', is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        for i in range(3):
+            Product.objects.create(
+                name=f'Product, {i}', description='Description', price=Decimal(i), owner=self.admin,
+            )
+
+    def test_export_streams_every_product(self):
+        response = self.client.get('/products/export/')
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], [
+            'Product, 0', 'Product, 1', 'Product, 2',
+        ])
+
+    def test_incremental_csv_export(self):
+        since = Product.objects.get(name='Product, 1').updated_at
+        response = self.client.get('/products/export/', {'format': 'csv', 'since': since.isoformat()})
+        rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:2], ['id', 'name'])
+        self.assertEqual([row[1] for row in rows[1:]], ['Product, 2'])
+
+    def test_export_pages_through_ties_on_updated_at(self):
+        Product.objects.create(name='Product, 3', description='Description', price=Decimal(3), owner=self.admin)
+        # Two pages of two rows plus the empty page that ends the export;
+        # the second page starts between rows sharing an updated_at.
+        Product.objects.filter(name__in=['Product, 1', 'Product, 2']).update(
+            updated_at=Product.objects.get(name='Product, 1').updated_at,
+        )
+        with CaptureQueriesContext(connection) as queries:
+            rows = list(export_rows(chunk_size=2))
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(all('LIMIT 2' in query['sql'] for query in queries))
+        self.assertEqual(sorted(row[1] for row in rows), ['Product, 0', 'Product, 1', 'Product, 2', 'Product, 3'])
+        self.assertEqual(len({row[0] for row in rows}), 4)
+
+    @override_settings(ASGI=True, PRODUCT_EXPORT_CHUNK_SIZE=2)
+    async def test_export_streams_asynchronously_under_asgi(self):
+        access = (await AccountRefreshToken.afor_user(self.admin)).access_token
+        response = await self.async_client.get('/products/export/', headers={'Authorization': f'Bearer {access}'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual([json.loads(line)['name'] for line in b''.join(chunks).decode().splitlines()], [
+            'Product, 0', 'Product, 1', 'Product, 2',
+        ])
+
+
+class BulkImportTests(TestCase):
+    def setUp(self):
+        self.owner = ApplicationUser.objects.create_user(username='owner', email='owner@example.com')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.checkpoint = Checkpoint(os.path.join(directory.name, 'import.checkpoint'))
+
+    def records(self, count):
+        return [
+            {'name': f'Imported {i}', 'description': 'Description', 'price': '1.00', 'owner_id': self.owner.pk}
+            for i in range(count)
+        ]
+
+    def test_resume_after_a_failed_chunk(self):
+        class FailingImporter(ProductImporter):
+            chunks = 0
+
+            def write(self, objects):
+                super().write(objects)
+                self.chunks += 1
+                if self.chunks == 2:
+                    raise OperationalError('Lost connection.')
+
+        with self.assertRaises(OperationalError):
+            list(run_import(FailingImporter(), self.records(5), 2, self.checkpoint))
+        # The failed chunk was rolled back and isn't checkpointed.
+        self.assertEqual(self.checkpoint.load(), 2)
+        self.assertEqual(Product.objects.count(), 2)
+
+        results = list(run_import(ProductImporter(), self.records(5), 2, self.checkpoint))
+        self.assertEqual([result.position for result in results], [4, 5])
+        self.assertEqual(
+            sorted(Product.objects.values_list('name', flat=True)), [f'Imported {i}' for i in range(5)],
+        )
+
+    def test_duplicates_within_a_chunk_are_rejected(self):
+        user = {
+            'username': 'imported', 'email': 'imported@example.com', 'phone': '+14155550190',
+            'password': 'Pass-word-12', 'first_name': 'Imported', 'last_name': 'User', 'role': 'employee',
+        }
+        records = [
+            user,
+            {**user, 'username': 'imported-2'},
+            {**user, 'email': 'other@example.com', 'phone': '+14155550191'},
+            {**user, 'username': 'Imported-3', 'email': 'IMPORTED@example.com', 'phone': '+14155550192'},
+            {**user, 'username': 'IMPORTED', 'email': 'another@example.com', 'phone': '+14155550193'},
+        ]
+        [result] = run_import(UserImporter(hash_workers=1), records, 10)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(result.errors, {
+            2: {'email': ['Duplicate email in input.']},
+            3: {'username': ['Duplicate username in input.']},
+            4: {'email': ['Duplicate email in input.']},
+            5: {'username': ['Duplicate username in input.']},
+        })
+        self.assertTrue(ApplicationUser.objects.filter(username='imported').exists())
+
+        records = [{**user, 'username': 'Imported', 'email': 'new@example.com', 'phone': '+14155550194'}]
+        [result] = run_import(UserImporter(hash_workers=1), records, 10)
+        self.assertEqual(result.errors, {1: {'username': ['A user with that username already exists.']}})
+
+    def test_missing_file_is_a_command_error(self):
+        with self.assertRaisesMessage(CommandError, 'No such file or directory'):
+            call_command('bulk_import', 'products', '/nonexistent/products.csv')
+
+
+class ProductScopeTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        self.owner = ApplicationUser.objects.create_user(username='owner', email='owner@example.com')
+        self.other = ApplicationUser.objects.create_user(username='other', email='other@example.com')
+        self.product = Product.objects.create(
+            name='Other', description='Description', price=Decimal('1.00'), owner=self.other,
+        )
+        self.client.force_authenticate(self.owner)
+
+    def test_unowned_products_are_never_fetched(self):
+        with CaptureQueriesContext(connection) as queries:
+            responses = [
+                self.client.patch(f'/products/{self.product.pk}/', {'price': '2.00'}),
+                self.client.delete(f'/products/{self.product.pk}/'),
+            ]
+        self.assertEqual([response.status_code for response in responses], [404, 404])
+        product_queries = [q['sql'] for q in queries.captured_queries if '"products_product"' in q['sql']]
+        self.assertEqual(len(product_queries), 2)
+        for sql in product_queries:
+            self.assertIn(f'"products_product"."owner_id" = {self.owner.pk}', sql)
+        self.assertTrue(Product.objects.filter(pk=self.product.pk, price=Decimal('1.00')).exists())
+
+    def test_admin_scope_is_unrestricted(self):
+        admin = ApplicationUser.objects.create_user(username='admin', email='admin@example.com', role='admin')
+        self.client.force_authenticate(admin)
+        response = self.client.patch(f'/products/{self.product.pk}/', {'price': '2.00'})
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_SERVER_TIMING=True)
+class ProductInstrumentationTests(TestCase):
+    def test_list_reports_server_timing_and_metrics(self):
+        get_cache().clear()
+        owner = ApplicationUser.objects.create_user(username='owner', email='owner@example.com')
+        Product.objects.create(name='Product', description='Description', price=Decimal('1.00'), owner=owner)
+
+        response = APIClient().get('/products/')
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries", serializer;dur=[\d.]+')
+
+        metrics = APIClient().get('/metrics').content.decode()
+        self.assertIn('http_request_db_queries_bucket{view="product-list",le="1"}', metrics)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'], METRICS_TOKEN='scrape-token')
+    def test_metrics_are_only_served_to_scrapers(self):
+        client = APIClient()
+        self.assertEqual(client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 200)
+        self.assertEqual(client.get('/metrics', REMOTE_ADDR='10.0.0.2').status_code, 403)
+        self.assertEqual(
+            client.get('/metrics', REMOTE_ADDR='10.0.0.2', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403,
+        )
+        self.assertEqual(
+            client.get('/metrics', REMOTE_ADDR='10.0.0.2', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200,
+        )
+
+    async def test_async_request_reports_server_timing(self):
+        await sync_to_async(get_cache().clear)()
+        owner = await ApplicationUser.objects.acreate(username='owner', email='owner@example.com')
+        await Product.objects.acreate(name='Product', description='Description', price=Decimal('1.00'), owner=owner)
+
+        response = await self.async_client.get('/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="1 queries", serializer;dur=[\d.]+')
+
+
+class ProductCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_process_local_cache_is_reported(self):
+        self.assertEqual([error.id for error in check_product_cache_is_shared(None)], ['products.W001'])
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'},
+    })
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_product_cache_is_shared(None), [])
+
+
+@skipUnless(has_lagging_replica(), "Needs a 'replica' database alias with its own test database.")
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ProductReplicaTests(TestCase):
+    """
+    Nothing is written to the replica test database, so it behaves like a
+    replica that has not caught up with any write yet. The suite runs with
+    replicas off; these tests turn the 'replica' alias on.
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        get_cache().clear()
+        manager = ApplicationUser.objects.create_user(
+            username='manager', email='manager@example.com', role='manager',
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccountRefreshToken.for_user(manager).access_token}')
+
+    def test_client_reads_its_own_write(self):
+        response = self.client.post('/products/', {'name': 'New', 'description': 'New', 'price': '1.00'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(settings.DATABASE_READ_YOUR_WRITES_COOKIE, response.cookies)
+
+        response = self.client.get('/products/')
+        self.assertEqual([product['name'] for product in response.data['results']], ['New'])
+
+        # That fresh response was cached for everyone. Other reads without
+        # the cookie go to the lagging replica, and what it returns is
+        # neither cached nor tagged with the new catalogue version.
+        self.client.cookies.clear()
+        self.assertEqual(len(self.client.get('/products/').data['results']), 1)
+        response = self.client.get('/products/', {'ordering': 'name'})
+        self.assertEqual(response.data['results'], [])
+        self.assertNotIn('ETag', response)
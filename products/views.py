@@ -1,25 +1,204 @@
-from rest_framework import viewsets, permissions
+from django.conf import settings
+from django.db import router, transaction
+from django.http import StreamingHttpResponse
+from rest_framework import serializers, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
+
+from config.permissions import PolicyTable, ScopedQuerysetMixin
+from config.routers import current_routing
+
+from .cache import bump_catalogue_version, bumped_within, etag_matches, get_cache, make_key, muted_bumps
+from .export import CSVRenderer, NDJSONRenderer, aiter_lines, export_rows
+from .filters import ProductFilterBackend, ProductSearchFilter
 from .models import Product
-from .serializers import ProductSerializer
+from .pagination import ProductCursorPagination
+from .serializers import ProductBulkDeleteSerializer, ProductOwnerSerializer, ProductSerializer
 from .permissions import IsReadOnly, IsManagerOrAdmin, IsOwner, IsAdmin
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ScopedQuerysetMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    pagination_class = ProductCursorPagination
+    filter_backends = [ProductFilterBackend, ProductSearchFilter, OrderingFilter]
+    ordering_fields = ProductCursorPagination.keyset_fields
+    ordering = ProductCursorPagination.ordering
     permission_classes = [permissions.IsAuthenticated]
+    permission_policies = PolicyTable({
+        'list': [IsReadOnly],
+        'create': [IsManagerOrAdmin],
+        'bulk_create': [IsManagerOrAdmin],
+        'partial_update': [IsOwner | IsAdmin],
+        'destroy': [IsOwner | IsAdmin],
+        'bulk_update': [permissions.IsAuthenticated, IsOwner | IsAdmin],
+        'bulk_destroy': [permissions.IsAuthenticated, IsOwner | IsAdmin],
+    }, default=[permissions.IsAdminUser])
+
+    expandable_fields = ('owner',)
+
+    def get_sparse_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        model_fields = {field.name for field in Product._meta.concrete_fields}
+        return [name for name in fields.split(',') if name in model_fields] or None
+
+    def get_expand(self):
+        expand = self.request.query_params.get('expand', '')
+        return [name for name in expand.split(',') if name in self.expandable_fields]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('list', 'retrieve'):
+            context['fields'] = self.get_sparse_fields()
+            context['expand'] = self.get_expand()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve'):
+            return queryset
+
+        expand = self.get_expand()
+        sparse_fields = self.get_sparse_fields()
+        expand_owner = 'owner' in expand and (not sparse_fields or 'owner' in sparse_fields)
+
+        if expand_owner:
+            queryset = queryset.select_related('owner')
+        if sparse_fields or expand_owner:
+            # Pagination keys on (ordering field, id), so those are always loaded.
+            columns = set(sparse_fields or (field.name for field in Product._meta.concrete_fields))
+            columns |= {'id', *ProductCursorPagination.keyset_fields}
+            if expand_owner:
+                columns.discard('owner')
+                columns |= {f'owner__{name}' for name in ProductOwnerSerializer.Meta.fields}
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        """
+        Serve reads from the response cache. Keys embed the catalogue
+        version, which product writes bump, so a matching `If-None-Match`
+        is answered with a 304 without touching the database.
+        """
+        key, etag = make_key(request, self.action, kwargs.get(self.lookup_field))
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        # Clients pinned to the primary after a write skip the lookup, so
+        # they read their own write; their fresh response is stored.
+        routing = current_routing()
+        cache = get_cache()
+        data = None if routing is not None and routing.pinned else cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            if (
+                routing is not None and routing.read_replica
+                and bumped_within(settings.DATABASE_READ_YOUR_WRITES_SECONDS)
+            ):
+                # The replica may not have the write behind this catalogue
+                # version yet, so don't store or tag this response with it.
+                return Response(data)
+            cache.set(key, data, settings.PRODUCT_CACHE_TIMEOUT)
+        return Response(data, headers={'ETag': etag})
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
 
     def get_permissions(self):
-        print('method :', self.action)
-        if self.action == 'list':
-            permission_classes = [IsReadOnly]
-        elif self.action == 'create':
-            permission_classes = [IsManagerOrAdmin]
-        elif self.action in ['partial_update', 'destroy']:
-            permission_classes = [IsOwner | IsAdmin]
-        else:
-            permission_classes = [permissions.IsAdminUser]
-        return [permission() for permission in permission_classes]
+        return self.permission_policies.for_action(self.action)
 
     def perform_create(self, serializer):
-        serializer.save(owner=self.request.user)
+        serializer.save(owner_id=self.request.user.pk)
+
+    def get_bulk_serializer(self, *args, **kwargs):
+        return self.get_serializer(
+            *args, many=True, max_length=settings.PRODUCT_BULK_MAX_ITEMS, **kwargs
+        )
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        """
+        Create a list of products in one transaction. Any invalid item rejects
+        the whole request, the 400 body lists errors by position.
+        """
+        serializer = self.get_bulk_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic(), muted_bumps():
+            serializer.save(owner_id=request.user.pk)
+        bump_catalogue_version()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @bulk_create.mapping.patch
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Partially update a list of products, each item identified by `id`.
+        Products that do not exist or that the user may not modify are
+        reported as not found for that item.
+        """
+        ids = set()
+        if isinstance(request.data, list):
+            for item in request.data:
+                try:
+                    ids.add(int(item['id']))
+                except (KeyError, TypeError, ValueError):
+                    pass
+
+        with transaction.atomic():
+            instances = self.get_queryset().select_for_update().in_bulk(ids)
+            serializer = self.get_bulk_serializer(instances, data=request.data, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        bump_catalogue_version()
+        return Response(serializer.data)
+
+    @bulk_create.mapping.delete
+    def bulk_destroy(self, request, *args, **kwargs):
+        """
+        Delete the products in `ids` that the user may modify, in one
+        transaction. Other ids are skipped, `deleted` counts the rows removed.
+        """
+        serializer = ProductBulkDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        queryset = self.get_queryset().filter(pk__in=serializer.validated_data['ids'])
+        # Bumping per row inside the transaction would let a reader cache the
+        # old rows under the new version; bump once after commit instead.
+        with transaction.atomic(), muted_bumps():
+            _, deleted = queryset.delete()
+        deleted = deleted.get(Product._meta.label, 0)
+        if deleted:
+            bump_catalogue_version()
+        return Response({'deleted': deleted})
+
+    @action(detail=False, methods=['get'], renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request, *args, **kwargs):
+        """
+        Stream the whole catalogue as NDJSON (default) or CSV
+        (`?format=csv`). `?since=<datetime>` limits it to products updated
+        after that time, for incremental exports.
+        """
+        since = request.query_params.get('since')
+        if since is not None:
+            try:
+                since = serializers.DateTimeField().to_internal_value(since)
+            except serializers.ValidationError as e:
+                raise serializers.ValidationError({'since': e.detail})
+
+        renderer = request.accepted_renderer
+        # Streamed after dispatch returns, so pick the database now.
+        lines = renderer.stream(export_rows(since=since, using=router.db_for_read(Product)))
+        response = StreamingHttpResponse(
+            aiter_lines(lines) if settings.ASGI else lines,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = f'attachment; filename="products.{renderer.format}"'
+        return response